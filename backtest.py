@@ -0,0 +1,443 @@
+"""
+📼 WHALE COPY BACKTEST
+=======================
+Replays recorded Data API /trades dumps through the bot's copy filters and
+simulates the PnL of copying them, without trading live.
+
+Every parameter combination is evaluated with NumPy array operations and
+the grid is spread over a process pool, so thousands of configurations
+over months of history run in minutes.
+
+Usage:
+    python backtest.py --trades trades.jsonl --prices prices.json \\
+        --copy-amount 5,10,20 --min-size 50,100,500 \\
+        --max-daily 10,20,50 --delay 0,5,30,60 --coalesce 0,2 --out results.csv
+
+Trades: JSONL, one Data API trade (or a list of them) per line.
+Prices: JSON object mapping token ID to a /prices-history response or
+        to its "history" list of {"t": epoch_seconds, "p": price}.
+        Without it, copies fill at the whale's price and are marked at
+        the last whale price per token.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, List
+
+import numpy as np
+
+from whale_copy_bot import (
+    COALESCE_WINDOW_SECONDS,
+    COPY_AMOUNT_USD,
+    MAX_DAILY_TRADES,
+    MIN_WHALE_TRADE_SIZE,
+    MAX_TRADE_AGE_SECONDS,
+    parse_trade,
+    trade_epoch,
+    trade_id_of,
+)
+
+# Token index is packed above the timestamp in int64 price lookup keys
+TOKEN_SHIFT = 2 ** 34
+
+
+# =============================================================================
+# DATA LOADING
+# =============================================================================
+
+def load_trades(path: str, whale: Optional[str] = None) -> dict:
+    """Parse a trades dump into time-sorted columns.
+
+    Uses the bot's own trade_id_of/parse_trade, so dedupe, side and token
+    checks match live copying. The size filter is applied per config later.
+    """
+    whale = whale.lower() if whale else None
+    seen = set()
+    rows = []
+
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+
+            data = json.loads(line)
+            for item in data if isinstance(data, list) else [data]:
+                if whale and str(item.get("proxyWallet", "")).lower() != whale:
+                    continue
+
+                trade_id = trade_id_of(item)
+                if trade_id in seen:
+                    continue
+                seen.add(trade_id)
+
+                try:
+                    trade = parse_trade(item, 0.0)
+                except (TypeError, ValueError):
+                    continue
+                if trade is None or trade.price <= 0:
+                    continue
+
+                rows.append((trade_epoch(trade), 1 if trade.side == "BUY" else -1,
+                             trade.amount_usd, trade.price, trade.token_id,
+                             str(item.get("proxyWallet", "")).lower()))
+
+    rows.sort(key=lambda row: row[0])
+    token_ids = sorted({row[4] for row in rows})
+    token_index = {token_id: i for i, token_id in enumerate(token_ids)}
+    wallet_index = {wallet: i for i, wallet in enumerate(sorted({row[5] for row in rows}))}
+
+    return {
+        "ts": np.array([row[0] for row in rows], dtype=np.float64),
+        "side": np.array([row[1] for row in rows], dtype=np.int8),
+        "amount": np.array([row[2] for row in rows], dtype=np.float64),
+        "price": np.array([row[3] for row in rows], dtype=np.float64),
+        "token": np.array([token_index[row[4]] for row in rows], dtype=np.int64),
+        "wallet": np.array([wallet_index[row[5]] for row in rows], dtype=np.int64),
+        "token_ids": token_ids,
+    }
+
+
+def load_prices(path: Optional[str], trades: dict):
+    """Add price lookup arrays (sorted token/time keys) and final prices"""
+    n_tokens = len(trades["token_ids"])
+    token_index = {token_id: i for i, token_id in enumerate(trades["token_ids"])}
+
+    # Default mark: last whale price seen on each token (trades are time-sorted)
+    final = np.full(n_tokens, np.nan)
+    last = np.full(n_tokens, -1, dtype=np.int64)
+    np.maximum.at(last, trades["token"], np.arange(len(trades["token"])))
+    traded = last >= 0
+    final[traded] = trades["price"][last[traded]]
+
+    keys = np.empty(0, dtype=np.int64)
+    prices = np.empty(0, dtype=np.float64)
+
+    if path:
+        with open(path) as f:
+            raw = json.load(f)
+
+        key_parts, price_parts = [], []
+        for token_id, history in raw.items():
+            if token_id not in token_index:
+                continue
+            if isinstance(history, dict):
+                history = history.get("history", [])
+            if not history:
+                continue
+
+            t = np.array([point["t"] for point in history], dtype=np.int64)
+            p = np.array([point["p"] for point in history], dtype=np.float64)
+            order = np.argsort(t, kind="stable")
+            key_parts.append(token_index[token_id] * TOKEN_SHIFT + t[order])
+            price_parts.append(p[order])
+            final[token_index[token_id]] = p[order][-1]
+
+        if key_parts:
+            keys = np.concatenate(key_parts)
+            prices = np.concatenate(price_parts)
+            order = np.argsort(keys, kind="stable")
+            keys, prices = keys[order], prices[order]
+
+    trades["price_keys"] = keys
+    trades["price_values"] = prices
+    trades["final_price"] = np.nan_to_num(final)
+    return trades
+
+
+# =============================================================================
+# SIMULATION
+# =============================================================================
+
+def lookup_prices(data: dict, token: np.ndarray, at: np.ndarray, fallback: np.ndarray) -> np.ndarray:
+    """Last known price of each token at each time, else the fallback"""
+    keys = data["price_keys"]
+    if not len(keys):
+        return fallback.copy()
+
+    query = token * TOKEN_SHIFT + at.astype(np.int64)
+    idx = np.searchsorted(keys, query, side="right") - 1
+    valid = (idx >= 0) & (keys[np.maximum(idx, 0)] // TOKEN_SHIFT == token)
+    return np.where(valid, data["price_values"][np.maximum(idx, 0)], fallback)
+
+
+def grouped_cumsum(values: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Cumulative sum restarting at each group start (groups contiguous)"""
+    total = np.cumsum(values)
+    offsets = np.repeat(total[starts] - values[starts], counts)
+    return total - offsets
+
+
+def coalesce_fills(data: dict, min_size: float, window: float) -> dict:
+    """Whale fills over min_size as the live OrderCoalescer hands them on.
+
+    The first fill on a (wallet, token) goes out at once and opens a window;
+    the fills after it within the window are netted into one trade at the
+    whale's average price when it closes, dropped if flat or, when several
+    were merged, under min_size. Columns are sorted by emit time; lag is the
+    emit time minus the newest merged fill's, which counts towards max_age.
+    Depends only on min_size and window, so results are cached on data.
+    """
+    cache = data.setdefault("coalesced", {})
+    if (min_size, window) in cache:
+        return cache[(min_size, window)]
+
+    idx = np.flatnonzero(data["amount"] >= min_size)
+    if window <= 0:
+        result = {
+            "emit": data["ts"][idx], "lag": np.zeros(len(idx)), "side": data["side"][idx],
+            "amount": data["amount"][idx], "price": data["price"][idx], "token": data["token"][idx],
+        }
+        cache[(min_size, window)] = result
+        return result
+
+    ts, side, amount, price = (data[key][idx].tolist() for key in ("ts", "side", "amount", "price"))
+    token, wallet = data["token"][idx].tolist(), data["wallet"][idx].tolist()
+    rows = []
+    buckets: Dict[tuple, tuple] = {}  # (wallet, token) -> (closes_at, follow-up rows)
+
+    def flush(closes_at: float, members: list):
+        if not members:
+            return
+        net = sum(side[i] * amount[i] for i in members)
+        if abs(net) < 0.01:
+            return
+        direction = 1 if net > 0 else -1
+        if len(members) > 1 and abs(net) < min_size:
+            return
+        same = [i for i in members if side[i] == direction]
+        shares = sum(amount[i] / price[i] for i in same)
+        rows.append((closes_at, closes_at - max(ts[i] for i in members), direction,
+                     abs(net), sum(amount[i] for i in same) / shares, token[members[0]]))
+
+    for i in range(len(ts)):
+        key = (wallet[i], token[i])
+        bucket = buckets.get(key)
+        if bucket is not None and ts[i] >= bucket[0]:
+            flush(*buckets.pop(key))
+            bucket = None
+        if bucket is None:
+            buckets[key] = (ts[i] + window, [])
+            rows.append((ts[i], 0.0, side[i], amount[i], price[i], token[i]))
+        else:
+            bucket[1].append(i)
+    for bucket in buckets.values():
+        flush(*bucket)
+
+    rows.sort(key=lambda row: row[0])
+    columns = list(zip(*rows)) if rows else [()] * 6
+    result = {
+        "emit": np.array(columns[0], dtype=np.float64),
+        "lag": np.array(columns[1], dtype=np.float64),
+        "side": np.array(columns[2], dtype=np.int8),
+        "amount": np.array(columns[3], dtype=np.float64),
+        "price": np.array(columns[4], dtype=np.float64),
+        "token": np.array(columns[5], dtype=np.int64),
+    }
+    cache[(min_size, window)] = result
+    return result
+
+
+def grouped_scan(op: np.ufunc, values: np.ndarray, group: np.ndarray) -> np.ndarray:
+    """Running op (np.add, np.minimum) restarting at each group (groups contiguous).
+
+    Log-step scan: each pass folds in the value step rows back while it is in
+    the same group, so rounding stays within the group's own magnitudes.
+    """
+    result = values.astype(np.float64)
+    step = 1
+    while step < len(result):
+        same = group[step:] == group[:-step]
+        if not same.any():
+            break
+        result[step:] = np.where(same, op(result[step:], result[:-step]), result[step:])
+        step *= 2
+    return result
+
+
+def execute_copies(token: np.ndarray, requested: np.ndarray,
+                   held: Optional[np.ndarray] = None) -> np.ndarray:
+    """Shares each copy trades (time order in and out) when SELLs never exceed
+    holdings, starting from held shares per token (none by default)"""
+    # Group by token, keeping time order inside each token
+    order = np.argsort(token, kind="stable")
+    grouped = token[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(grouped)) + 1]
+
+    # Holdings floored at zero: H = C - min(0, running min of C) per token
+    cumulative = grouped_scan(np.add, requested[order], grouped)
+    opening = held[grouped] if held is not None else np.zeros(len(grouped))
+    cumulative += opening
+    running_min = grouped_scan(np.minimum, cumulative, grouped)
+    holdings = cumulative - np.minimum(running_min, 0.0)
+
+    executed = np.diff(holdings, prepend=0.0)
+    executed[starts] = holdings[starts] - opening[starts]
+    executed[np.abs(executed) < 1e-6] = 0.0  # Float noise from selling out exactly
+
+    result = np.empty_like(executed)
+    result[order] = executed
+    return result
+
+
+def simulate(data: dict, copy_amount: float, min_size: float, max_daily: int,
+             delay: float, max_age: float = MAX_TRADE_AGE_SECONDS, fee_bps: float = 0.0,
+             coalesce: float = COALESCE_WINDOW_SECONDS) -> dict:
+    """PnL of one configuration, vectorized apart from coalescing.
+
+    Mirrors the live bot: whale trades under min_size are ignored, follow-up
+    fills are coalesced, trades older than max_age by the time we act are
+    dropped, BUYs spend copy_amount and SELLs sell the same notional but
+    never more shares than we hold, and at most max_daily copies that
+    actually trade count per UTC day.
+    """
+    trades = coalesce_fills(data, min_size, coalesce)
+    idx = np.flatnonzero(trades["lag"] + delay <= max_age)
+    if not len(idx):
+        return {"pnl": 0.0, "copies": 0, "volume": 0.0, "fees": 0.0, "open_value": 0.0}
+
+    acted = trades["emit"][idx] + delay
+    token = trades["token"][idx]
+    entry = lookup_prices(data, token, acted, trades["price"][idx])
+    entry = np.clip(entry, 1e-6, None)
+    requested = trades["side"][idx] * (copy_amount / entry)
+
+    # Daily limit: a trade is attempted while fewer than max_daily earlier copies
+    # that day traded, and SELLs with nothing to sell don't count, so each day
+    # attempts a prefix of its trades. Copies only depend on earlier trades:
+    # one pass over everything is exact up to the first day the limit cuts,
+    # and from there each day is settled in one pass on the holdings carried
+    # into it.
+    day = (acted // 86400).astype(np.int64)
+    starts = np.r_[0, np.flatnonzero(np.diff(day)) + 1]
+    counts = np.diff(np.r_[starts, len(day)])
+    n_tokens = len(data["final_price"])
+
+    executed = execute_copies(token, requested)
+    copied = (executed != 0).astype(np.float64)
+    cut = np.flatnonzero(grouped_cumsum(copied, starts, counts) - copied >= max_daily)
+    if len(cut):
+        first = np.searchsorted(starts, cut[0], side="right") - 1
+        settled_before = slice(0, starts[first])
+        held = np.bincount(token[settled_before], weights=executed[settled_before],
+                           minlength=n_tokens).astype(np.float64)  # int if empty
+        for start, count in zip(starts[first:].tolist(), counts[first:].tolist()):
+            part = slice(start, start + count)
+            settled = execute_copies(token[part], requested[part], held)
+            copied = (settled != 0).astype(np.float64)
+            settled[np.cumsum(copied) - copied >= max_daily] = 0.0
+            executed[part] = settled
+            held += np.bincount(token[part], weights=settled, minlength=n_tokens)
+
+    cash = -executed * entry
+    fees = np.abs(cash).sum() * fee_bps / 10000
+    holdings = np.bincount(token, weights=executed, minlength=n_tokens)
+    open_value = float((holdings * data["final_price"]).sum())
+
+    return {
+        "pnl": float(cash.sum() + open_value - fees),
+        "copies": int(np.count_nonzero(executed)),
+        "volume": float(np.abs(cash).sum()),
+        "fees": float(fees),
+        "open_value": open_value,
+    }
+
+
+# =============================================================================
+# PARAMETER SWEEP
+# =============================================================================
+
+_worker_data: Optional[dict] = None
+
+
+def _init_worker(data: dict):
+    global _worker_data
+    _worker_data = data
+
+
+def _run_config(config: dict) -> dict:
+    return {**config, **simulate(_worker_data, **config)}
+
+
+def sweep(data: dict, grid: Dict[str, list], workers: int) -> List[dict]:
+    """Evaluate every combination in the grid across a process pool"""
+    keys = list(grid)
+    configs = [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+
+    if workers <= 1:
+        _init_worker(data)
+        return [_run_config(config) for config in configs]
+
+    chunksize = max(1, len(configs) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(data,)) as pool:
+        return list(pool.map(_run_config, configs, chunksize=chunksize))
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def parse_list(value: str, cast=float) -> list:
+    return [cast(part) for part in value.split(",") if part.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest whale copy settings on recorded trades")
+    parser.add_argument("--trades", required=True, help="Data API /trades dump (JSONL)")
+    parser.add_argument("--prices", help="Price history JSON keyed by token ID")
+    parser.add_argument("--whale", help="Only replay trades from this proxyWallet")
+    parser.add_argument("--copy-amount", default=str(COPY_AMOUNT_USD))
+    parser.add_argument("--min-size", default=str(MIN_WHALE_TRADE_SIZE))
+    parser.add_argument("--max-daily", default=str(MAX_DAILY_TRADES))
+    parser.add_argument("--delay", default="0", help="Seconds between whale fill and our fill")
+    parser.add_argument("--coalesce", default=str(COALESCE_WINDOW_SECONDS),
+                        help="Seconds follow-up fills on a token are merged for (0 = off)")
+    parser.add_argument("--max-age", type=float, default=MAX_TRADE_AGE_SECONDS)
+    parser.add_argument("--fee-bps", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--out", help="Write every result to this CSV")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    data = load_prices(args.prices, load_trades(args.trades, args.whale))
+    print(f"📼 Loaded {len(data['ts']):,} trades on {len(data['token_ids']):,} tokens "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    grid = {
+        "copy_amount": parse_list(args.copy_amount),
+        "min_size": parse_list(args.min_size),
+        "max_daily": parse_list(args.max_daily, int),
+        "delay": parse_list(args.delay),
+        "coalesce": parse_list(args.coalesce),
+        "max_age": [args.max_age],
+        "fee_bps": [args.fee_bps],
+    }
+
+    started = time.perf_counter()
+    results = sweep(data, grid, args.workers)
+    results.sort(key=lambda result: result["pnl"], reverse=True)
+    print(f"⚙️  Evaluated {len(results):,} configurations in {time.perf_counter() - started:.1f}s")
+
+    print(f"\n{'Copy $':>8} {'Min $':>8} {'Daily':>6} {'Delay':>6} {'Merge':>6} {'Copies':>7} {'Volume $':>11} {'PnL $':>10}")
+    for result in results[:args.top]:
+        print(f"{result['copy_amount']:>8.2f} {result['min_size']:>8.0f} {result['max_daily']:>6} "
+              f"{result['delay']:>6.0f} {result['coalesce']:>6.0f} {result['copies']:>7} "
+              f"{result['volume']:>11,.2f} {result['pnl']:>10,.2f}")
+
+    if args.out:
+        with open(args.out, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]) if results else [])
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"\n💾 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
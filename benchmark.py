@@ -0,0 +1,674 @@
+"""
+⏱️  WHALE COPY BENCHMARK
+========================
+Measures detection latency, throughput and memory of the bot without
+touching Polymarket or real money.
+
+A local stand-in serves the Data API /trades and /positions endpoints,
+Gamma /markets and the CLOB endpoints used for signing and posting orders
+(tick size, neg risk, fee rate, book(s), /order, API key derivation). It has
+configurable latency, burst sizes and 429/500 injection. The real
+WhaleCopyBot runs against it with a throwaway key, so orders are signed
+for real and only the network is local.
+
+A second stand-in plays the real-time trade socket; --stream-check runs
+the bot against both to check wallet filtering, dedupe between the stream
+and the poller, and falling back to polling while the socket is down.
+
+Usage:
+    python benchmark.py                         # all scenarios
+    python benchmark.py --scenario burst_500    # one scenario
+    python benchmark.py --out bench.json        # save results for comparison
+    python benchmark.py --stream-check          # trade stream checks
+
+Runs are seeded, so the same seed replays the same wallets, bursts and
+injected errors.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import resource
+import socket
+import tempfile
+import threading
+import time
+from typing import Optional, Dict, List
+from urllib.parse import urlsplit, parse_qs
+
+import websockets
+
+# Throwaway key: signs orders for the local mock only
+BENCH_PRIVATE_KEY = "0x" + "11" * 32
+BENCH_FUNDER = "0x" + "22" * 20
+BENCH_API_SECRET = "YmVuY2htYXJrLXNlY3JldC1ub3QtcmVhbA=="
+
+SCENARIOS = {
+    # Many wallets, a few fills scattered across them each round
+    "wallets_1k": {
+        "wallets": 1000, "rounds": 3, "fills_per_round": 50,
+        "latency_ms": 20, "jitter_ms": 10, "api_rate": 2000,
+    },
+    # The default 10 rps budget, where one scan of the watch list takes ~25s
+    "wallets_200_10rps": {
+        "wallets": 200, "rounds": 2, "fills_per_round": 20,
+        "latency_ms": 20, "jitter_ms": 10, "api_rate": 10,
+    },
+    # One wallet fires far more fills than a single page holds
+    "burst_500": {
+        "wallets": 1, "rounds": 1, "fills_per_round": 500,
+        "latency_ms": 20, "jitter_ms": 10, "api_rate": 2000,
+    },
+    # A third of all requests rate limited with Retry-After
+    "storm_429": {
+        "wallets": 100, "rounds": 3, "fills_per_round": 20,
+        "latency_ms": 20, "jitter_ms": 10, "api_rate": 2000,
+        "throttle_rate": 0.3, "retry_after": 1,
+    },
+}
+
+wcb = None  # whale_copy_bot, imported once the environment points at the mock
+
+
+# =============================================================================
+# MOCK POLYMARKET
+# =============================================================================
+
+class MockPolymarket:
+    """Local stand-in for the Data, Gamma and CLOB APIs (HTTP/1.1 keep-alive).
+
+    Serves from its own thread and event loop: the bot makes blocking
+    py-clob-client calls (credential derivation, order posting) that
+    would otherwise stall a mock sharing its loop.
+    """
+
+    def __init__(self, port: int, seed: int, latency_ms: float = 20, jitter_ms: float = 10,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0, retry_after: float = 1):
+        self.port = port
+        self.rng = random.Random(seed)  # Latency and injected errors (mock thread)
+        self.fill_rng = random.Random(seed + 1)  # Burst placement (bot thread)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self.connections = set()
+
+        self.trades: Dict[str, List[dict]] = {}  # wallet -> newest first
+        self.next_token = 10 ** 20
+        self.polled = set()  # Wallets whose trades have been fetched at least once
+        self.injected: Dict[str, float] = {}  # token -> epoch injected
+        self.detected: Dict[str, float] = {}
+        self.detections: Dict[str, int] = {}  # token -> times the bot handed it to the copy pipeline
+        self.ordered: Dict[str, float] = {}
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.deep_page_delay = 0.0  # Extra seconds before answering /trades pages past the first
+        self.deep_pages = 0
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self._serve(), self.loop).result()
+
+    def close(self):
+        if self.loop:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+
+    async def _serve(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", self.port)
+
+    async def _shutdown(self):
+        self.server.close()
+        for writer in list(self.connections):
+            writer.close()
+        await self.server.wait_closed()
+
+    # --- scenario control -----------------------------------------------------
+
+    def _fill(self, wallet: str, timestamp: int) -> dict:
+        self.next_token += 1
+        token_id = str(self.next_token)
+        return {
+            "proxyWallet": wallet,
+            "side": "BUY",
+            "asset": token_id,
+            "conditionId": f"0xcond{token_id}",
+            "size": 1000,
+            "price": 0.5,
+            "timestamp": timestamp,
+            "title": "Benchmark market",
+            "outcome": "Yes",
+            "transactionHash": f"0xtx{token_id}",
+        }
+
+    def seed_history(self, wallets: List[str]):
+        """One old fill per wallet so the bot has a cursor before timing starts"""
+        old = int(time.time()) - 86400
+        for wallet in wallets:
+            self.trades[wallet] = [self._fill(wallet, old)]
+
+    def inject(self, wallets: List[str], fills: int):
+        """New fills spread over the given wallets, timestamped now"""
+        for _ in range(fills):
+            self.add_fill(self.fill_rng.choice(wallets))
+
+    def add_fill(self, wallet: str, listed: bool = True) -> dict:
+        """A new fill timestamped now; unlisted fills never show up in /trades"""
+        now = time.time()
+        fill = self._fill(wallet, int(now))
+        if listed:
+            self.trades.setdefault(wallet, []).insert(0, fill)
+        self.injected[fill["asset"]] = now
+        return fill
+
+    @staticmethod
+    def _book(token_id: str) -> dict:
+        return {
+            "market": "", "asset_id": token_id, "timestamp": str(int(time.time() * 1000)),
+            "last_trade_price": "0.5", "min_order_size": "5", "neg_risk": False,
+            "tick_size": "0.01", "hash": "",
+            "bids": [{"price": "0.49", "size": "100000"}],
+            "asks": [{"price": "0.51", "size": "100000"}],
+        }
+
+    # --- HTTP -----------------------------------------------------------------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                method, target = request_line.decode().split(" ")[:2]
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode().partition(":")
+                    headers[key.strip().lower()] = value.strip()
+
+                body = b""
+                if headers.get("content-length"):
+                    body = await reader.readexactly(int(headers["content-length"]))
+
+                status, payload, extra = await self._route(method, target, body)
+                data = json.dumps(payload).encode()
+                head = (f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n{extra}\r\n")
+                writer.write(head.encode() + data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    async def _route(self, method: str, target: str, body: bytes):
+        self.requests += 1
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        path = url.path
+
+        await asyncio.sleep(max(0.0, self.latency_ms + self.rng.uniform(-1, 1) * self.jitter_ms) / 1000)
+
+        # Startup credential derivation is never throttled, so every scenario gets to run
+        if self.throttle_rate and not path.startswith("/auth/") and self.rng.random() < self.throttle_rate:
+            self.throttled += 1
+            return "429 Too Many Requests", {"error": "rate limited"}, f"Retry-After: {self.retry_after}\r\n"
+        if self.error_rate and not path.startswith("/auth/") and self.rng.random() < self.error_rate:
+            self.errors += 1
+            return "500 Internal Server Error", {"error": "injected"}, ""
+
+        if path == "/":
+            return "200 OK", "OK", ""
+
+        if path == "/trades":
+            wallet = (query.get("proxyWallet") or query.get("user") or [""])[0]
+            self.polled.add(wallet)
+            limit = int(query.get("limit", ["50"])[0])
+            offset = int(query.get("offset", ["0"])[0])
+            if offset and self.deep_page_delay:
+                self.deep_pages += 1
+                await asyncio.sleep(self.deep_page_delay)
+            return "200 OK", self.trades.get(wallet, [])[offset:offset + limit], ""
+
+        if path == "/positions":
+            return "200 OK", [], ""
+
+        if path == "/markets":
+            return "200 OK", [{"conditionId": cid} for cid in query.get("condition_ids", [])], ""
+
+        if path.startswith("/markets/"):
+            return "200 OK", {"conditionId": path.rsplit("/", 1)[-1]}, ""
+
+        if path == "/tick-size":
+            return "200 OK", {"minimum_tick_size": 0.01}, ""
+
+        if path == "/neg-risk":
+            return "200 OK", {"neg_risk": False}, ""
+
+        if path == "/fee-rate":
+            return "200 OK", {"base_fee": 0}, ""
+
+        if path == "/book":
+            return "200 OK", self._book(query.get("token_id", [""])[0]), ""
+
+        if path == "/books" and method == "POST":
+            return "200 OK", [self._book(entry["token_id"]) for entry in json.loads(body)], ""
+
+        if path in ("/auth/api-key", "/auth/derive-api-key"):
+            return "200 OK", {"apiKey": "bench", "secret": BENCH_API_SECRET, "passphrase": "bench"}, ""
+
+        if path == "/order" and method == "POST":
+            token_id = str(json.loads(body)["order"]["tokenId"])
+            self.ordered.setdefault(token_id, time.time())
+            return "200 OK", {"success": True, "orderID": f"0xorder{token_id}", "status": "matched"}, ""
+
+        return "404 Not Found", {"error": "not found"}, ""
+
+
+class MockTradeStream:
+    """Local stand-in for the real-time trade socket.
+
+    Pushes activity events to every subscriber. `drop` stops the server,
+    closing connections and refusing new ones, until `restore`.
+    """
+
+    def __init__(self, port: int):
+        self.port = port
+        self.server = None
+        self.subscribers = set()
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}"
+
+    async def restore(self):
+        self.server = await websockets.serve(self._handle, "127.0.0.1", self.port)
+
+    async def drop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        self.subscribers.clear()
+
+    async def _handle(self, ws, *_):
+        await ws.recv()  # Subscription request
+        self.subscribers.add(ws)
+        try:
+            await ws.wait_closed()
+        finally:
+            self.subscribers.discard(ws)
+
+    async def push(self, fill: dict):
+        message = json.dumps({"topic": "activity", "type": "trades", "payload": fill})
+        for ws in list(self.subscribers):
+            with contextlib.suppress(Exception):
+                await ws.send(message)
+
+
+# =============================================================================
+# HARNESS
+# =============================================================================
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb() -> float:
+    """Current resident set size, falling back to the peak"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def percentiles(values: List[float]) -> dict:
+    if not values:
+        return {"p50": None, "p90": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": round(ordered[-1] * 1000, 1)}
+
+
+def configure(port: int, workdir: str):
+    """Point the bot's environment at the mock before importing it"""
+    global wcb
+    base = f"http://127.0.0.1:{port}"
+    os.environ.update({
+        "POLYMARKET_DATA_URL": base,
+        "POLYMARKET_GAMMA_URL": base,
+        "POLYMARKET_CLOB_URL": base,
+        "BOOK_STREAM_URL": f"ws://127.0.0.1:{port}/ws/market",  # Refused, so books come from snapshots
+        "POLY_PRIVATE_KEY": BENCH_PRIVATE_KEY,
+        "POLY_FUNDER_ADDRESS": BENCH_FUNDER,
+        "STATE_DB_PATH": os.path.join(workdir, "state.db"),
+        "METADATA_CACHE_PATH": os.path.join(workdir, "metadata.json"),
+        "API_CREDS_PATH": os.path.join(workdir, "api_creds.json"),
+        "STREAM_ENABLED": "false",
+        "METRICS_PORT": "0",
+    })
+    # Tunables keep production defaults unless overridden by the caller,
+    # except the daily cap which would otherwise stop every burst at 20
+    os.environ.setdefault("MAX_DAILY_TRADES", "1000000000")
+    os.environ.setdefault("POLL_CONCURRENCY", "50")
+
+    import whale_copy_bot
+    wcb = whale_copy_bot
+
+
+def make_bench_bot(server: MockPolymarket, workers: int):
+    class BenchBot(wcb.WhaleCopyBot):
+        """WhaleCopyBot that reports detection times to the mock"""
+
+        async def process_trades(self, new_trades):
+            now = time.time()
+            for trade in new_trades:
+                server.detected.setdefault(trade.token_id, now)
+                server.detections[trade.token_id] = server.detections.get(trade.token_id, 0) + 1
+            await super().process_trades(new_trades)
+
+    return BenchBot(workers=workers)
+
+
+async def run_scenario(name: str, config: dict, port: int, seed: int, workdir: str,
+                       timeout: float, workers: int = 1) -> dict:
+    rng = random.Random(seed)
+    wallets = [f"0x{rng.getrandbits(160):040x}" for _ in range(config["wallets"])]
+
+    server = MockPolymarket(
+        port, seed,
+        latency_ms=config.get("latency_ms", 20),
+        jitter_ms=config.get("jitter_ms", 10),
+        error_rate=config.get("error_rate", 0.0),
+        throttle_rate=config.get("throttle_rate", 0.0),
+        retry_after=config.get("retry_after", 1),
+    )
+    server.seed_history(wallets)
+    server.start()
+
+    # Fresh state per scenario
+    for suffix in ("", "-wal", "-shm"):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(wcb.STATE_DB_PATH + suffix)
+    whales_file = os.path.join(workdir, "whales.txt")
+    with open(whales_file, "w") as f:
+        f.write("\n".join(wallets))
+    wcb.WHALES_FILE = whales_file
+    wcb.rate_limiter = wcb.RateLimiter(rate=config["api_rate"], burst=config["api_rate"])
+    # Detector workers are separate processes and size their budgets from the environment
+    wcb.API_RATE_LIMIT = wcb.API_RATE_BURST = config["api_rate"]
+    os.environ["API_RATE_LIMIT"] = os.environ["API_RATE_BURST"] = str(config["api_rate"])
+    wcb.metrics = wcb.Metrics()
+
+    rss_before = rss_mb()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        booted = time.time()
+        bot = make_bench_bot(server, workers)
+        if not await bot.initialize():
+            raise RuntimeError("bot failed to initialize against the mock")
+        task = asyncio.create_task(bot.run())
+
+        # Let the first scan record every wallet's cursor (works for any worker count)
+        deadline = time.time() + timeout
+        while len(server.polled) < len(wallets) and time.time() < deadline:
+            await asyncio.sleep(0.01)
+        first_poll = time.time() - booted
+        await asyncio.sleep(0.2)  # Cursors are journaled just after the page arrives
+
+        started = time.time()
+        for _ in range(config["rounds"]):
+            server.inject(wallets, config["fills_per_round"])
+            expected = len(server.injected)
+            round_deadline = time.time() + timeout
+            while time.time() < round_deadline:
+                if len(server.detected) >= expected and len(server.ordered) >= expected:
+                    break
+                await asyncio.sleep(0.01)
+
+        finished = time.time()
+        bot.running = False
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        await bot.close()
+
+    server.close()
+
+    detection = [server.detected[t] - server.injected[t] for t in server.injected if t in server.detected]
+    fill = [server.ordered[t] - server.injected[t] for t in server.injected if t in server.ordered]
+    active = max(finished - started, 1e-9)
+    poll = wcb.metrics.histogram("poll_duration_ms")
+
+    return {
+        "scenario": name,
+        "seed": seed,
+        "workers": workers,
+        "config": config,
+        "injected": len(server.injected),
+        "detected": len(detection),
+        "ordered": len(fill),
+        "missed": len(server.injected) - len(detection),
+        "detection_ms": percentiles(detection),
+        "fill_ms": percentiles(fill),
+        "detected_per_sec": round(len(detection) / active, 1),
+        "orders_per_sec": round(len(fill) / active, 1),
+        "time_to_first_poll_ms": round(first_poll * 1000, 1),
+        "poll_p50_ms": poll.quantile(0.5) if poll else None,
+        "requests": server.requests,
+        "throttled": server.throttled,
+        "errors": server.errors,
+        "rss_mb": round(rss_mb(), 1),
+        "rss_growth_mb": round(rss_mb() - rss_before, 1),
+    }
+
+
+async def wait_until(condition, timeout: float) -> bool:
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+async def run_stream_check(port: int, seed: int, workdir: str, timeout: float) -> List[tuple]:
+    """Run the bot with streaming on against both stand-ins; (check, passed) pairs"""
+    rng = random.Random(seed)
+    watched = [f"0x{rng.getrandbits(160):040x}" for _ in range(2)]
+    unwatched = f"0x{rng.getrandbits(160):040x}"
+
+    server = MockPolymarket(port, seed, latency_ms=5, jitter_ms=2)
+    server.seed_history(watched)
+    server.start()
+    stream = MockTradeStream(free_port())
+    await stream.restore()
+
+    for suffix in ("", "-wal", "-shm"):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(wcb.STATE_DB_PATH + suffix)
+    whales_file = os.path.join(workdir, "whales.txt")
+    with open(whales_file, "w") as f:
+        f.write("\n".join(watched))
+    wcb.WHALES_FILE = whales_file
+    stream_poll_interval = wcb.STREAM_POLL_INTERVAL
+    wcb.STREAM_ENABLED = True
+    wcb.STREAM_POLL_INTERVAL = 1.0  # Reconciliation polls often enough to race the stream
+    wcb.rate_limiter = wcb.RateLimiter(rate=2000, burst=2000)
+    wcb.metrics = wcb.Metrics()
+
+    def detections(fill: dict) -> int:
+        return server.detections.get(fill["asset"], 0)
+
+    checks = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        bot = make_bench_bot(server, 1)
+        bot.stream.url = stream.url
+        if not await bot.initialize():
+            raise RuntimeError("bot failed to initialize against the mock")
+        task = asyncio.create_task(bot.run())
+
+        try:
+            await wait_until(lambda: len(server.polled) == len(watched) and bot.stream.connected, timeout)
+            await asyncio.sleep(0.2)  # Cursors are journaled just after the page arrives
+
+            # Only the stream knows these fills, so detection can't come from polling
+            ignored = server.add_fill(unwatched, listed=False)
+            pushed = server.add_fill(watched[0], listed=False)
+            await stream.push(ignored)
+            await stream.push(pushed)
+            checks.append(("watched wallet streamed", await wait_until(lambda: detections(pushed), timeout)))
+            await asyncio.sleep(0.5)
+            checks.append(("unwatched wallet ignored", not detections(ignored)))
+
+            # Stream first, then the poller sees the same fill over a few reconciliation polls
+            both = server.add_fill(watched[1])
+            await stream.push(both)
+            await wait_until(lambda: detections(both), timeout)
+            await asyncio.sleep(3)
+            checks.append(("stream then poll copied once", detections(both) == 1))
+
+            # Poller first, then the stream repeats it
+            polled = server.add_fill(watched[0])
+            await wait_until(lambda: detections(polled), timeout)
+            await stream.push(polled)
+            await asyncio.sleep(0.5)
+            checks.append(("poll then stream copied once", detections(polled) == 1))
+
+            # A burst spanning pages: the stream repeats fills while the poller waits on page 2,
+            # one it already parsed (newest) and one it has yet to reach (oldest)
+            burst = [server.add_fill(watched[0]) for _ in range(30)]
+            deep_pages = server.deep_pages
+            server.deep_page_delay = 1.0
+            await wait_until(lambda: server.deep_pages > deep_pages, timeout)
+            await stream.push(burst[-1])
+            await stream.push(burst[0])
+            await wait_until(lambda: all(detections(fill) for fill in burst), timeout)
+            server.deep_page_delay = 0.0
+            await asyncio.sleep(1.5)
+            checks.append(("multi-page poll and stream copied once", all(detections(fill) == 1 for fill in burst)))
+
+            # Socket down: with reconciliation polls out of the way, only the fallback can find new fills
+            wcb.STREAM_POLL_INTERVAL = 3600.0
+            await stream.drop()
+            checks.append(("drop noticed", await wait_until(lambda: not bot.stream.connected, timeout)))
+            fallback = server.add_fill(watched[1])
+            checks.append(("polled while down", await wait_until(lambda: detections(fallback), timeout)))
+
+            # Socket back: reconnects and streams again
+            await stream.restore()
+            checks.append(("reconnected", await wait_until(lambda: bot.stream.connected and stream.subscribers, timeout)))
+            resumed = server.add_fill(watched[1], listed=False)
+            await stream.push(resumed)
+            checks.append(("streamed after reconnect", await wait_until(lambda: detections(resumed), timeout)))
+        finally:
+            bot.running = False
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+            await bot.close()
+            await stream.drop()
+            server.close()
+            wcb.STREAM_ENABLED = False
+            wcb.STREAM_POLL_INTERVAL = stream_poll_interval
+
+    return checks
+
+
+def print_checks(checks: List[tuple]):
+    print("""
+┌──────────────────────────────────────────────────────────────────────┐
+│ ⚡ TRADE STREAM CHECKS                                               │
+├──────────────────────────────────────────────────────────────────────┤""")
+    for name, passed in checks:
+        print(f"│ {'✅' if passed else '❌'} {name:<66}│")
+    print("└──────────────────────────────────────────────────────────────────────┘")
+
+
+def print_result(result: dict):
+    detection, fill = result["detection_ms"], result["fill_ms"]
+    print(f"""
+┌──────────────────────────────────────────────────────────────────────┐
+│ ⏱️  {f"{result['scenario']} ({result['workers']} worker(s))":<65}│
+├──────────────────────────────────────────────────────────────────────┤
+│ Fills detected:    {result['detected']}/{result['injected']} (missed {result['missed']})
+│ Orders posted:     {result['ordered']}/{result['injected']}
+│ Detection ms:      p50 {detection['p50']}  p90 {detection['p90']}  p99 {detection['p99']}  max {detection['max']}
+│ Fill ms:           p50 {fill['p50']}  p90 {fill['p90']}  p99 {fill['p99']}  max {fill['max']}
+│ First poll:        {result['time_to_first_poll_ms']} ms after startup
+│ Throughput:        {result['detected_per_sec']} detected/s, {result['orders_per_sec']} orders/s
+│ Requests:          {result['requests']} ({result['throttled']} throttled, {result['errors']} errors)
+│ RSS:               {result['rss_mb']} MB (+{result['rss_growth_mb']} MB)
+└──────────────────────────────────────────────────────────────────────┘""")
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+async def run(args) -> List[dict]:
+    if args.stream_check:
+        checks = await run_stream_check(args.port, args.seed, args.workdir, args.timeout)
+        print_checks(checks)
+        if not all(passed for _, passed in checks):
+            raise SystemExit(1)
+        return []
+
+    names = [args.scenario] if args.scenario else list(SCENARIOS)
+    results = []
+    for name in names:
+        result = await run_scenario(name, SCENARIOS[name], args.port, args.seed,
+                                    args.workdir, args.timeout, args.workers)
+        print_result(result)
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the whale copy bot against a local mock API")
+    parser.add_argument("--scenario", choices=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--port", type=int, default=0, help="Mock API port (0 = any free port)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait per round")
+    parser.add_argument("--workers", type=int, default=1, help="Detector processes (WORKERS)")
+    parser.add_argument("--out", help="Write results as JSON")
+    parser.add_argument("--stream-check", action="store_true",
+                        help="Check the trade stream against a local socket instead of benchmarking")
+    args = parser.parse_args()
+
+    args.port = args.port or free_port()
+    args.workdir = tempfile.mkdtemp(prefix="whalebot-bench-")
+    configure(args.port, args.workdir)
+
+    results = asyncio.run(run(args))
+
+    if args.out and results:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""
+🔭 WHALE DISCOVERY
+===================
+Finds wallets worth copying: bulk-downloads trade history for candidate
+wallets from the Data API, then ranks them by realized PnL, win rate,
+size and activity.
+
+Each wallet's history is cached as a compressed columnar .npz file, so
+reruns only fetch trades newer than the cache. Stats are computed with
+NumPy group-bys over all wallets at once, which handles millions of
+trades without building Python objects per trade.
+
+Usage:
+    python discover_whales.py --wallets candidates.txt --out whales.txt
+    python discover_whales.py --discover-pages 20 --min-trade-size 500 --top 25 --out whales.txt
+
+Candidates: one address per line (WHALES_FILE format works), and/or wallets
+            behind large trades in the most recent global /trades pages.
+Output:     the top wallets in WHALES_FILE format, ready for the bot.
+
+Positions are scored from trade cash flows: a position is closed once the
+wallet's net shares in the token are back to ~0. Shares held to resolution
+never show up as SELL trades, so they count as open and are marked at the
+last traded price.
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import os
+import time
+from collections import Counter
+from typing import Optional, Dict, List
+
+import numpy as np
+
+from whale_copy_bot import (
+    MIN_WHALE_TRADE_SIZE,
+    POLL_CONCURRENCY,
+    POLYMARKET_DATA,
+    backoff_delay,
+    create_http_client,
+    decode_json,
+    parse_whales,
+)
+
+PAGE_SIZE = 500
+MAX_OFFSET = 10000  # Deepest offset the Data API pages to
+COLUMNS = ("ts", "side", "size", "price", "token")
+CLOSED_SHARES = 1e-6  # Net position treated as flat
+
+
+# =============================================================================
+# DOWNLOAD
+# =============================================================================
+
+def token_key(token_id: str) -> int:
+    """64-bit key for a token ID, so tokens are stored as a numeric column"""
+    return int.from_bytes(hashlib.blake2b(token_id.encode(), digest_size=8).digest(), "big")
+
+
+def page_columns(items: list) -> Dict[str, np.ndarray]:
+    """One /trades page as columns; rows without a side or price are dropped"""
+    rows = []
+    for item in items:
+        side = str(item.get("side", "")).upper()
+        if side not in ("BUY", "SELL"):
+            continue
+        try:
+            size = float(item.get("size") or 0)
+            price = float(item.get("price") or 0)
+            ts = int(float(item.get("timestamp") or 0))
+        except (TypeError, ValueError):
+            continue
+        if size <= 0 or price <= 0 or not item.get("asset"):
+            continue
+        rows.append((ts, 1 if side == "BUY" else -1, size, price, token_key(item["asset"])))
+
+    return {
+        "ts": np.array([row[0] for row in rows], dtype=np.int64),
+        "side": np.array([row[1] for row in rows], dtype=np.int8),
+        "size": np.array([row[2] for row in rows], dtype=np.float64),
+        "price": np.array([row[3] for row in rows], dtype=np.float64),
+        "token": np.array([row[4] for row in rows], dtype=np.uint64),
+    }
+
+
+def concat_columns(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    if not parts:
+        return page_columns([])
+    return {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+
+
+def cache_path(cache_dir: str, wallet: str) -> str:
+    return os.path.join(cache_dir, f"{wallet}.npz")
+
+
+def load_cached(cache_dir: str, wallet: str) -> Optional[Dict[str, np.ndarray]]:
+    path = cache_path(cache_dir, wallet)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return {name: data[name] for name in COLUMNS}
+
+
+def save_cached(cache_dir: str, wallet: str, columns: Dict[str, np.ndarray]):
+    """Atomic write so an interrupted run never leaves a truncated cache file"""
+    path = cache_path(cache_dir, wallet)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez_compressed(tmp_path, **columns)
+    os.replace(tmp_path, path)
+
+
+def unseen_at(fetched: Dict[str, np.ndarray], cached: Dict[str, np.ndarray], ts: int) -> np.ndarray:
+    """Mask of fetched rows at second ts beyond those the cache already holds.
+
+    The cache keeps no trade IDs, so rows match on every column; identical
+    fills in the same second are counted, not collapsed.
+    """
+    def row(columns: Dict[str, np.ndarray], i: int) -> tuple:
+        return tuple(columns[name][i].item() for name in COLUMNS)
+
+    held = Counter(row(cached, i) for i in np.flatnonzero(cached["ts"] == ts))
+    mask = np.zeros(len(fetched["ts"]), dtype=bool)
+    for i in np.flatnonzero(fetched["ts"] == ts):
+        key = row(fetched, i)
+        if held[key]:
+            held[key] -= 1
+        else:
+            mask[i] = True
+    return mask
+
+
+async def fetch_page(http, params: dict, retries: int = 5) -> Optional[list]:
+    """GET /trades, retrying 429s and server errors with backoff"""
+    for attempt in range(retries):
+        try:
+            response = await http.get(f"{POLYMARKET_DATA}/trades", params=params)
+            if response.status_code == 200:
+                return decode_json(response.content)
+            if response.status_code != 429 and response.status_code < 500:
+                return None
+        except Exception:
+            pass
+        await asyncio.sleep(backoff_delay(attempt, base=1.0, cap=30.0))
+    return None
+
+
+async def download_wallet(http, semaphore: asyncio.Semaphore, cache_dir: str, wallet: str,
+                          refresh_after: float) -> str:
+    """Fetch a wallet's history, only walking back to the newest cached trade"""
+    cached = load_cached(cache_dir, wallet)
+    path = cache_path(cache_dir, wallet)
+    if cached is not None and time.time() - os.path.getmtime(path) < refresh_after:
+        return "cached"
+
+    newest = int(cached["ts"].max()) if cached is not None and len(cached["ts"]) else None
+    parts = []
+
+    async with semaphore:
+        for offset in range(0, MAX_OFFSET, PAGE_SIZE):
+            items = await fetch_page(http, {"proxyWallet": wallet, "limit": PAGE_SIZE, "offset": offset})
+            if items is None:
+                return "failed"
+            columns = page_columns(items)
+            parts.append(columns)
+            # Pages are newest first: stop once we are back inside the cache
+            if len(items) < PAGE_SIZE or (newest is not None and len(columns["ts"]) and columns["ts"].min() < newest):
+                break
+
+    fetched = concat_columns(parts)
+    if cached is not None:
+        # The overlap with the cache is re-fetched; drop it before merging. Trades in the
+        # cache's newest second may have been indexed after it was written, so keep those
+        keep = (fetched["ts"] > newest) | unseen_at(fetched, cached, newest)
+        fetched = {name: column[keep] for name, column in fetched.items()}
+        fetched = concat_columns([fetched, cached])
+    save_cached(cache_dir, wallet, fetched)
+    return "updated" if cached is not None else "downloaded"
+
+
+async def discover_candidates(http, pages: int, min_trade_size: float) -> List[str]:
+    """Wallets behind large trades in the most recent global /trades pages"""
+    wallets: Dict[str, None] = {}
+    for page in range(pages):
+        items = await fetch_page(http, {"limit": PAGE_SIZE, "offset": page * PAGE_SIZE})
+        if not items:
+            break
+        for item in items:
+            try:
+                notional = float(item.get("size") or 0) * float(item.get("price") or 0)
+            except (TypeError, ValueError):
+                continue
+            if notional >= min_trade_size and item.get("proxyWallet"):
+                wallets[str(item["proxyWallet"]).lower()] = None
+    return list(wallets)
+
+
+async def download_all(wallets: List[str], cache_dir: str, concurrency: int, refresh_after: float):
+    http = create_http_client(concurrency)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    started = time.perf_counter()
+    counts: Dict[str, int] = {}
+
+    try:
+        tasks = [download_wallet(http, semaphore, cache_dir, wallet, refresh_after) for wallet in wallets]
+        for i, task in enumerate(asyncio.as_completed(tasks), 1):
+            status = await task
+            counts[status] = counts.get(status, 0) + 1
+            if i % 100 == 0 or i == len(tasks):
+                print(f"📥 {i:,}/{len(tasks):,} wallets ({time.perf_counter() - started:.0f}s) {counts}")
+    finally:
+        await http.aclose()
+
+
+# =============================================================================
+# STATS
+# =============================================================================
+
+def load_store(cache_dir: str, wallets: List[str]) -> dict:
+    """Concatenate cached wallets into one set of columns plus a wallet code"""
+    parts, codes, kept = [], [], []
+    for wallet in wallets:
+        columns = load_cached(cache_dir, wallet)
+        if columns is None or not len(columns["ts"]):
+            continue
+        codes.append(np.full(len(columns["ts"]), len(kept), dtype=np.int32))
+        parts.append(columns)
+        kept.append(wallet)
+
+    data = concat_columns(parts)
+    data["wallet"] = np.concatenate(codes) if codes else np.empty(0, dtype=np.int32)
+    data["wallets"] = kept
+    return data
+
+
+def wallet_stats(data: dict) -> Dict[str, np.ndarray]:
+    """Per-wallet stats via group-bys over all trades at once"""
+    n_wallets = len(data["wallets"])
+    wallet = data["wallet"]
+    notional = data["size"] * data["price"]
+
+    trades = np.bincount(wallet, minlength=n_wallets)
+    volume = np.bincount(wallet, weights=notional, minlength=n_wallets)
+    first = np.full(n_wallets, np.iinfo(np.int64).max)
+    last = np.full(n_wallets, np.iinfo(np.int64).min)
+    np.minimum.at(first, wallet, data["ts"])
+    np.maximum.at(last, wallet, data["ts"])
+    active_days = np.maximum((last - first) / 86400, 1.0)
+
+    # Positions: one group per (wallet, token), keyed as a single int64
+    tokens, token_index = np.unique(data["token"], return_inverse=True)
+    token_index = token_index.ravel()
+    position_keys, position = np.unique(wallet.astype(np.int64) * len(tokens) + token_index,
+                                        return_inverse=True)
+    position = position.ravel()
+    position_wallet = position_keys // max(len(tokens), 1)
+    position_token = position_keys % max(len(tokens), 1)
+    n_positions = len(position_keys)
+    net_shares = np.bincount(position, weights=data["side"] * data["size"], minlength=n_positions)
+    cash = np.bincount(position, weights=-data["side"] * notional, minlength=n_positions)
+
+    # Open positions are marked at the token's last traded price in the data. Fancy-index
+    # assignment with repeated indices has no defined winner, so pick each token's last row
+    order = np.argsort(data["ts"], kind="stable")
+    last_row = np.full(len(tokens), -1, dtype=np.int64)
+    np.maximum.at(last_row, token_index[order], np.arange(len(order)))
+    last_price = np.zeros(len(tokens))
+    traded = last_row >= 0
+    last_price[traded] = data["price"][order[last_row[traded]]]
+
+    closed = np.abs(net_shares) <= CLOSED_SHARES
+    open_value = np.where(closed, 0.0, net_shares * last_price[position_token])
+
+    closed_count = np.bincount(position_wallet, weights=closed, minlength=n_wallets)
+    wins = np.bincount(position_wallet, weights=closed & (cash > 0), minlength=n_wallets)
+    realized = np.bincount(position_wallet, weights=np.where(closed, cash, 0.0), minlength=n_wallets)
+    unrealized = np.bincount(position_wallet, weights=np.where(closed, 0.0, cash + open_value), minlength=n_wallets)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        win_rate = np.where(closed_count > 0, wins / closed_count, 0.0)
+        avg_size = np.where(trades > 0, volume / trades, 0.0)
+
+    return {
+        "trades": trades,
+        "volume_usd": volume,
+        "avg_size_usd": avg_size,
+        "trades_per_day": trades / active_days,
+        "closed_positions": closed_count.astype(np.int64),
+        "win_rate": win_rate,
+        "realized_pnl": realized,
+        "unrealized_pnl": unrealized,
+        "last_trade": last,
+    }
+
+
+def rank(stats: Dict[str, np.ndarray], rank_by: str, min_trades: int, min_closed: int,
+         active_within_days: float) -> np.ndarray:
+    """Wallet indices passing the filters, best first"""
+    eligible = (stats["trades"] >= min_trades) & (stats["closed_positions"] >= min_closed)
+    if active_within_days > 0:
+        eligible &= stats["last_trade"] >= time.time() - active_within_days * 86400
+    idx = np.flatnonzero(eligible)
+    return idx[np.argsort(-stats[rank_by][idx], kind="stable")]
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def read_candidates(path: str) -> List[str]:
+    with open(path) as f:
+        return [whale.address for whale in parse_whales(f.read())]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download, score and rank candidate whale wallets")
+    parser.add_argument("--wallets", help="Candidate wallets, one per line (WHALES_FILE format)")
+    parser.add_argument("--discover-pages", type=int, default=0,
+                        help="Also take wallets from this many recent global /trades pages")
+    parser.add_argument("--min-trade-size", type=float, default=MIN_WHALE_TRADE_SIZE,
+                        help="Trade size ($) that makes a wallet a candidate when discovering")
+    parser.add_argument("--cache", default="whale_cache", help="Directory of per-wallet columnar caches")
+    parser.add_argument("--refresh-hours", type=float, default=6.0,
+                        help="Re-fetch wallets whose cache is older than this")
+    parser.add_argument("--concurrency", type=int, default=POLL_CONCURRENCY)
+    parser.add_argument("--rank-by", default="realized_pnl",
+                        choices=["realized_pnl", "win_rate", "volume_usd", "avg_size_usd", "trades_per_day"])
+    parser.add_argument("--min-trades", type=int, default=20)
+    parser.add_argument("--min-closed", type=int, default=5, help="Closed positions needed for a win rate")
+    parser.add_argument("--active-days", type=float, default=30.0, help="Must have traded this recently (0 = any)")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", help="Write the top wallets in WHALES_FILE format")
+    parser.add_argument("--csv", help="Write stats for every wallet")
+    args = parser.parse_args()
+
+    os.makedirs(args.cache, exist_ok=True)
+    wallets: Dict[str, None] = {}
+    if args.wallets:
+        wallets.update(dict.fromkeys(read_candidates(args.wallets)))
+
+    async def fetch():
+        if args.discover_pages:
+            http = create_http_client(args.concurrency)
+            try:
+                found = await discover_candidates(http, args.discover_pages, args.min_trade_size)
+            finally:
+                await http.aclose()
+            print(f"🔭 Found {len(found):,} wallets behind trades of ${args.min_trade_size:,.0f}+")
+            wallets.update(dict.fromkeys(found))
+        await download_all(list(wallets), args.cache, args.concurrency, args.refresh_hours * 3600)
+
+    if not args.wallets and not args.discover_pages:
+        parser.error("give --wallets and/or --discover-pages")
+    asyncio.run(fetch())
+
+    started = time.perf_counter()
+    data = load_store(args.cache, list(wallets))
+    stats = wallet_stats(data)
+    order = rank(stats, args.rank_by, args.min_trades, args.min_closed, args.active_days)
+    print(f"📊 Scored {len(data['wallets']):,} wallets over {len(data['ts']):,} trades "
+          f"in {time.perf_counter() - started:.1f}s, {len(order):,} pass the filters")
+
+    print(f"\n{'Wallet':<44} {'Trades':>7} {'Avg $':>9} {'/day':>6} {'Closed':>7} {'Win':>5} {'Realized $':>12}")
+    for i in order[:args.top]:
+        print(f"{data['wallets'][i]:<44} {stats['trades'][i]:>7} {stats['avg_size_usd'][i]:>9,.0f} "
+              f"{stats['trades_per_day'][i]:>6.1f} {stats['closed_positions'][i]:>7} "
+              f"{stats['win_rate'][i]:>5.0%} {stats['realized_pnl'][i]:>12,.2f}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(f"# Top wallets by {args.rank_by} (discover_whales.py)\n")
+            for i in order[:args.top]:
+                # No commas: parse_whales splits entries on them before stripping comments
+                f.write(f"{data['wallets'][i]}  # pnl ${stats['realized_pnl'][i]:.0f} "
+                        f"win {stats['win_rate'][i]:.0%} trades {stats['trades'][i]}\n")
+        print(f"\n💾 Wrote {min(args.top, len(order))} wallets to {args.out} (use it as WHALES_FILE)")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["wallet", *stats])
+            for i, wallet in enumerate(data["wallets"]):
+                writer.writerow([wallet, *(column[i] for column in stats.values())])
+        print(f"💾 Stats for every wallet written to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,14 +12,57 @@ Author: Built with Claude
 """
 
 import asyncio
+import bisect
+import hashlib
+import itertools
 import json
+import multiprocessing
+import queue
 import time
 import os
+import random
+import signal
+import socket
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Optional, Dict, List
-from dataclasses import dataclass
+from typing import Optional, Dict, List, Callable, Awaitable
+from dataclasses import dataclass, asdict, replace
 import httpx
 
+# HTTP/2 lets all wallet polls share one multiplexed connection
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# orjson decodes API pages several times faster than the stdlib
+try:
+    import orjson
+    decode_json = orjson.loads
+except ImportError:
+    decode_json = json.loads
+
+# Streaming trade ingestion is optional; polling is used without it
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+# Preload the signing stack once instead of importing it on every order
+try:
+    from py_clob_client.client import ClobClient
+    from py_clob_client.clob_types import (
+        ApiCreds, MarketOrderArgs, OrderType, CreateOrderOptions, PartialCreateOrderOptions
+    )
+    from py_clob_client.order_builder.constants import BUY, SELL
+except ImportError:
+    ClobClient = None
+    BUY, SELL = "BUY", "SELL"
+
 # Load environment variables
 try:
     from dotenv import load_dotenv
@@ -31,30 +74,111 @@ except ImportError:
 # CONFIGURATION
 # =============================================================================
 
+# Time-to-first-poll is measured from here
+STARTED_AT = time.perf_counter()
+
 # Whale to copy
 WHALE_ADDRESS = os.getenv("WHALE_ADDRESS", "0x6a72f61820b26b1fe4d956e17b6dc2a1ea3033ee")
 
+# Multiple whales: comma-separated "address[:copy_amount[:min_trade_size]]",
+# or a file with one entry per line. Either overrides WHALE_ADDRESS.
+WHALE_ADDRESSES = os.getenv("WHALE_ADDRESSES", "")
+WHALES_FILE = os.getenv("WHALES_FILE", "")
+POLL_CONCURRENCY = int(os.getenv("POLL_CONCURRENCY", "20"))  # Max wallets polled at once
+
+# Trade fetching: a small first page once a wallet has a cursor, growing
+# pages walking backwards when a burst overflows it
+TRADES_PAGE_SIZE = int(os.getenv("TRADES_PAGE_SIZE", "50"))  # First poll of a wallet
+INCREMENTAL_PAGE_SIZE = int(os.getenv("INCREMENTAL_PAGE_SIZE", "10"))
+MAX_TRADES_PAGE_SIZE = int(os.getenv("MAX_TRADES_PAGE_SIZE", "500"))
+MAX_PAGES_PER_POLL = int(os.getenv("MAX_PAGES_PER_POLL", "10"))
+
+# Polling schedule: tightens to the minimum after whale activity, decays
+# towards the maximum while quiet, backs off exponentially on errors
+MIN_POLL_INTERVAL = float(os.getenv("MIN_POLL_INTERVAL", "2"))
+MAX_POLL_INTERVAL = float(os.getenv("MAX_POLL_INTERVAL", "30"))
+POLL_DECAY = float(os.getenv("POLL_DECAY", "1.5"))  # Interval multiplier per quiet scan
+ERROR_BACKOFF_BASE = float(os.getenv("ERROR_BACKOFF_BASE", "5"))
+ERROR_BACKOFF_MAX = float(os.getenv("ERROR_BACKOFF_MAX", "300"))
+
+# Streaming ingestion: push trades from the real-time socket, with the
+# cursor poller as a slow safety net while it is up and full fallback when down
+STREAM_ENABLED = os.getenv("STREAM_ENABLED", "false").lower() in ("1", "true", "yes")
+STREAM_URL = os.getenv("STREAM_URL", "wss://ws-live-data.polymarket.com")
+STREAM_POLL_INTERVAL = float(os.getenv("STREAM_POLL_INTERVAL", "60"))  # Reconciliation polls while streaming
+
+# Local order books for slippage checks: CLOB snapshots kept current by the
+# market channel socket, re-snapshotted while it is down
+BOOK_STREAM_URL = os.getenv("BOOK_STREAM_URL", "wss://ws-subscriptions-clob.polymarket.com/ws/market")
+BOOK_CACHE_SIZE = int(os.getenv("BOOK_CACHE_SIZE", "500"))  # Tokens whose books are kept
+BOOK_MAX_AGE_SECONDS = float(os.getenv("BOOK_MAX_AGE_SECONDS", "10"))  # Snapshot age trusted without the socket
+MAX_SLIPPAGE = float(os.getenv("MAX_SLIPPAGE", "0.05"))  # Max fill price move from the whale's, as a fraction; 0 = off
+
+# One request budget shared by Data API, Gamma and CLOB calls
+API_RATE_LIMIT = float(os.getenv("API_RATE_LIMIT", "10"))  # Requests per second
+API_RATE_BURST = float(os.getenv("API_RATE_BURST", "20"))
+
 # Your credentials
 POLY_PRIVATE_KEY = os.getenv("POLY_PRIVATE_KEY", "")
 POLY_FUNDER_ADDRESS = os.getenv("POLY_FUNDER_ADDRESS", "")
 POLY_SIGNATURE_TYPE = int(os.getenv("POLY_SIGNATURE_TYPE", "1"))
+API_CREDS_PATH = os.getenv("API_CREDS_PATH", "api_creds.json")  # Derived API creds cache (0600); empty = off
 
 # Trading settings
 COPY_AMOUNT_USD = float(os.getenv("COPY_AMOUNT_USD", "10"))  # Amount per copied trade
 MAX_DAILY_TRADES = int(os.getenv("MAX_DAILY_TRADES", "20"))
 MIN_WHALE_TRADE_SIZE = float(os.getenv("MIN_WHALE_TRADE_SIZE", "100"))  # Only copy trades > $100
+MAX_MARKET_EXPOSURE_USD = float(os.getenv("MAX_MARKET_EXPOSURE_USD", "0"))  # Cost basis cap per market; 0 = no cap
+MIN_ORDER_USD = 1.0  # Smallest marketable order the CLOB accepts
+
+# Our positions: updated from our own fills, reconciled with the Data API
+POSITION_SYNC_INTERVAL = float(os.getenv("POSITION_SYNC_INTERVAL", "300"))
+POSITION_INDEX_LAG_SECONDS = float(os.getenv("POSITION_INDEX_LAG_SECONDS", "120"))  # Our fills a snapshot may still miss
+
+# Market/token metadata cache
+METADATA_CACHE_PATH = os.getenv("METADATA_CACHE_PATH", "metadata_cache.json")
+METADATA_CACHE_SIZE = int(os.getenv("METADATA_CACHE_SIZE", "5000"))  # Entries per cache
+MARKET_CACHE_TTL = float(os.getenv("MARKET_CACHE_TTL", "3600"))  # Gamma markets
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "900"))  # CLOB tick size / neg risk / fee rate
+
+# Execution settings
+ORDER_WORKERS = int(os.getenv("ORDER_WORKERS", "4"))  # Orders signed/posted in parallel
+COPY_CONCURRENCY = int(os.getenv("COPY_CONCURRENCY", "2"))  # Trades copied at the same time
+COPY_QUEUE_SIZE = int(os.getenv("COPY_QUEUE_SIZE", "1000"))  # Detected trades waiting to be copied
+MAX_TRADE_AGE_SECONDS = float(os.getenv("MAX_TRADE_AGE_SECONDS", "120"))  # Older whale trades are not copied
+COALESCE_WINDOW_SECONDS = float(os.getenv("COALESCE_WINDOW_SECONDS", "2"))  # Merge follow-up fills per token (0 = off)
+
+# Sharding: detector processes each polling a slice of the wallets, feeding
+# one supervisor that owns the account's copy pipeline (1 = single process)
+WORKERS = int(os.getenv("WORKERS", "1"))
+
+# State persistence
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "whale_bot_state.db")
+SEEN_CACHE_SIZE = int(os.getenv("SEEN_CACHE_SIZE", "10000"))  # Trade IDs kept in memory
+SEEN_RETENTION_DAYS = float(os.getenv("SEEN_RETENTION_DAYS", "7"))  # Journal history kept on disk
+HWM_GRACE_SECONDS = int(os.getenv("HWM_GRACE_SECONDS", "600"))  # API indexing lag tolerated
 
-# API URLs
-POLYMARKET_CLOB = "https://clob.polymarket.com"
-POLYMARKET_DATA = "https://data-api.polymarket.com"
-POLYMARKET_GAMMA = "https://gamma-api.polymarket.com"
+# Hot standby: instances sharing STATE_DB_PATH elect a leader through a lease
+# in it; the others stay warm and take over as soon as the lease lapses
+LEADER_LEASE_ENABLED = os.getenv("LEADER_LEASE_ENABLED", "false").lower() in ("1", "true", "yes")
+LEASE_TTL_SECONDS = float(os.getenv("LEASE_TTL_SECONDS", "3"))  # Leader silence before a standby takes over
+LEASE_RENEW_SECONDS = float(os.getenv("LEASE_RENEW_SECONDS", "0.5"))  # Leader renewals and standby checks
+
+# Metrics endpoint (Prometheus text at /metrics, JSON at /metrics.json); 0 = off
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# API URLs (overridable to point the bot at a staging or local mock API)
+POLYMARKET_CLOB = os.getenv("POLYMARKET_CLOB_URL", "https://clob.polymarket.com")
+POLYMARKET_DATA = os.getenv("POLYMARKET_DATA_URL", "https://data-api.polymarket.com")
+POLYMARKET_GAMMA = os.getenv("POLYMARKET_GAMMA_URL", "https://gamma-api.polymarket.com")
 
 
 # =============================================================================
 # DATA MODELS
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class WhaleTrade:
     """Represents a trade made by the whale"""
     timestamp: str
@@ -65,9 +189,153 @@ class WhaleTrade:
     amount_usd: float
     price: float
     token_id: str
+    whale_address: str = ""
+    deadline: float = 0.0  # Epoch seconds after which copying is pointless
+    fills: int = 1  # Whale fills merged into this trade
+    seen_at: float = 0.0  # Epoch seconds the API response/stream event arrived
+    detected_at: float = 0.0  # Epoch seconds parsing finished
+    pending_id: int = 0  # Row in the pending-trades store while waiting to be copied
+
+
+def epoch_seconds(timestamp) -> float:
+    """An API timestamp in epoch seconds; some sources send milliseconds"""
+    if type(timestamp) is not int:
+        timestamp = float(timestamp or 0)
+    return timestamp / 1000 if timestamp > 1e12 else timestamp
+
+
+def chain_epoch(whale_trade: WhaleTrade) -> Optional[float]:
+    """On-chain whale trade time in epoch seconds, if the API gave one"""
+    try:
+        timestamp = epoch_seconds(whale_trade.timestamp)
+    except (TypeError, ValueError):
+        return None
+    
+    return timestamp if timestamp > 0 else None
+
+
+def trade_epoch(whale_trade: WhaleTrade) -> float:
+    """Whale trade time in epoch seconds, or now if the API didn't give one"""
+    return chain_epoch(whale_trade) or time.time()
+
+
+def trade_id_of(item: dict) -> str:
+    """Unique ID of a Data API trade"""
+    return item.get("transactionHash") or item.get("id") or f"{item.get('timestamp')}_{item.get('asset')}"
+
+
+def parse_trade(item: dict, min_trade_size: float, whale_address: str = "") -> Optional[WhaleTrade]:
+    """Apply the copy filters to a Data API trade; None if it isn't worth copying.
+    
+    Side and size are checked before anything is allocated, since most
+    trades on a busy wallet are filtered out.
+    """
+    # Get side (the API sends upper case; only normalize when it doesn't)
+    side = item.get("side")
+    if side != "BUY" and side != "SELL":
+        side = str(side or "").upper()
+        if side not in ("BUY", "SELL"):
+            return None
+    
+    # Calculate amount in USD
+    size = item.get("size") or 0
+    price = item.get("price") or 0
+    if type(size) is not float:
+        size = float(size)
+    if type(price) is not float:
+        price = float(price)
+    amount = size * price
+    
+    if amount < min_trade_size:
+        return None
+    
+    # The 'asset' field is the token ID we need!
+    token_id = item.get("asset")
+    
+    if not token_id:
+        metrics.inc("trades_rejected_total", reason="no_token")
+        return None
+    
+    # Get market info
+    title = item.get("title", "") or item.get("slug", "") or "Unknown"
+    outcome = item.get("outcome", "YES")
+    
+    return WhaleTrade(
+        timestamp=str(item.get("timestamp", "")),
+        market_id=item.get("conditionId", ""),
+        market_title=title,
+        side=side,
+        outcome=outcome,
+        amount_usd=amount,
+        price=price,
+        token_id=token_id,
+        whale_address=whale_address
+    )
 
 
 @dataclass
+class WhaleConfig:
+    """A watched wallet and its copy settings"""
+    address: str
+    copy_amount_usd: float = COPY_AMOUNT_USD
+    min_trade_size: float = MIN_WHALE_TRADE_SIZE
+
+
+def parse_whales(spec: str) -> List[WhaleConfig]:
+    """Parse "address[:copy_amount[:min_trade_size]]" entries (commas or newlines)"""
+    whales: Dict[str, WhaleConfig] = {}
+    
+    for entry in spec.replace("\n", ",").split(","):
+        entry = entry.split("#", 1)[0].strip()
+        if not entry:
+            continue
+        
+        parts = [part.strip() for part in entry.split(":")]
+        whale = WhaleConfig(address=parts[0].lower())
+        if len(parts) > 1 and parts[1]:
+            whale.copy_amount_usd = float(parts[1])
+        if len(parts) > 2 and parts[2]:
+            whale.min_trade_size = float(parts[2])
+        whales[whale.address] = whale
+    
+    return list(whales.values())
+
+
+def load_whales() -> List[WhaleConfig]:
+    """Watched wallets from WHALES_FILE, WHALE_ADDRESSES or WHALE_ADDRESS"""
+    if WHALES_FILE and os.path.exists(WHALES_FILE):
+        with open(WHALES_FILE) as f:
+            whales = parse_whales(f.read())
+        if whales:
+            return whales
+    
+    if WHALE_ADDRESSES:
+        whales = parse_whales(WHALE_ADDRESSES)
+        if whales:
+            return whales
+    
+    return parse_whales(WHALE_ADDRESS)
+
+
+@dataclass(slots=True)
+class Position:
+    """Shares we hold of one outcome token"""
+    token_id: str
+    market_id: str = ""
+    size: float = 0.0  # Shares
+    cost_usd: float = 0.0  # Cost basis of the shares still held
+
+
+@dataclass(slots=True)
+class LocalBook:
+    """Price levels of one token's order book (price -> size in shares)"""
+    bids: Dict[float, float]
+    asks: Dict[float, float]
+    updated_at: float
+    live: bool = False  # Kept current by the socket rather than a one-off snapshot
+
+
+@dataclass(slots=True)
 class CopiedTrade:
     """Represents a trade we copied"""
     whale_trade: WhaleTrade
@@ -76,222 +344,2191 @@ class CopiedTrade:
     timestamp: str
 
 
+@dataclass
+class OrderResult:
+    """Outcome of an order plus per-stage timings in milliseconds"""
+    success: bool
+    side: str
+    token_id: str
+    amount: float
+    response: Optional[dict] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    queue_ms: float = 0.0  # Waiting for a free worker
+    sign_ms: float = 0.0   # create_market_order
+    post_ms: float = 0.0   # post_order HTTP round-trip
+    ack_ms: float = 0.0    # Submit until the result is back on the event loop
+
+    def timings(self) -> str:
+        return (f"queue {self.queue_ms:.0f}ms, sign {self.sign_ms:.0f}ms, "
+                f"post {self.post_ms:.0f}ms, ack {self.ack_ms:.0f}ms")
+
+
+# =============================================================================
+# METRICS
+# =============================================================================
+
+class Histogram:
+    """Fixed-bucket latency histogram (milliseconds); observe is a bisect and two adds"""
+    
+    BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000,
+                  10000, 30000, 60000, 120000, 300000)
+    
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, value_ms: float):
+        self.counts[bisect.bisect_left(self.BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.sum += value_ms
+    
+    def merge(self, other: "Histogram"):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+    
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile"""
+        if not self.count:
+            return 0.0
+        
+        target = q * self.count
+        running = 0
+        for i, count in enumerate(self.counts):
+            running += count
+            if running >= target:
+                return float(self.BUCKETS_MS[i]) if i < len(self.BUCKETS_MS) else float("inf")
+        return float("inf")
+
+
+class Metrics:
+    """In-process counters, gauges and histograms for the metrics endpoint"""
+    
+    def __init__(self):
+        self.counters: Dict[tuple, float] = {}
+        self.histograms: Dict[tuple, Histogram] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+    
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return (name, tuple(sorted(labels.items())))
+    
+    def inc(self, name: str, amount: float = 1.0, **labels):
+        key = self._key(name, labels)
+        self.counters[key] = self.counters.get(key, 0.0) + amount
+    
+    def observe(self, name: str, value_ms: float, **labels):
+        key = self._key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value_ms)
+    
+    def gauge(self, name: str, read: Callable[[], float]):
+        """Register a value read lazily at scrape time"""
+        self.gauges[name] = read
+    
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        return self.histograms.get(self._key(name, labels))
+    
+    def drain(self) -> tuple:
+        """Hand over counters and histograms recorded since the last drain (detector workers)"""
+        drained = (self.counters, self.histograms)
+        self.counters, self.histograms = {}, {}
+        return drained
+    
+    def merge(self, counters: Dict[tuple, float], histograms: Dict[tuple, Histogram]):
+        """Add a worker's drained counters and histograms to this registry"""
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0.0) + value
+        for key, other in histograms.items():
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.merge(other)
+    
+    @staticmethod
+    def _labels(labels: tuple, extra: str = "") -> str:
+        parts = [f'{key}="{value}"' for key, value in labels]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+    
+    def to_prometheus(self) -> str:
+        lines = []
+        for (name, labels), value in sorted(self.counters.items()):
+            lines.append(f"whalebot_{name}{self._labels(labels)} {value}")
+        
+        for name, read in sorted(self.gauges.items()):
+            try:
+                lines.append(f"whalebot_{name} {float(read())}")
+            except Exception:
+                continue
+        
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            running = 0
+            for bound, count in zip(Histogram.BUCKETS_MS, histogram.counts):
+                running += count
+                bucket = self._labels(labels, 'le="%s"' % bound)
+                lines.append(f"whalebot_{name}_bucket{bucket} {running}")
+            bucket = self._labels(labels, 'le="+Inf"')
+            lines.append(f"whalebot_{name}_bucket{bucket} {histogram.count}")
+            lines.append(f"whalebot_{name}_sum{self._labels(labels)} {histogram.sum}")
+            lines.append(f"whalebot_{name}_count{self._labels(labels)} {histogram.count}")
+        
+        return "\n".join(lines) + "\n"
+    
+    def to_json(self) -> dict:
+        def label_name(name: str, labels: tuple) -> str:
+            return name + "".join(f".{value}" for _, value in labels)
+        
+        gauges = {}
+        for name, read in self.gauges.items():
+            try:
+                gauges[name] = float(read())
+            except Exception:
+                continue
+        
+        return {
+            "counters": {label_name(*key): value for key, value in self.counters.items()},
+            "gauges": gauges,
+            "histograms": {
+                label_name(*key): {
+                    "count": histogram.count,
+                    "avg_ms": histogram.sum / histogram.count if histogram.count else 0.0,
+                    "p50_ms": histogram.quantile(0.5),
+                    "p90_ms": histogram.quantile(0.9),
+                    "p99_ms": histogram.quantile(0.99),
+                }
+                for key, histogram in self.histograms.items()
+            },
+        }
+
+
+metrics = Metrics()
+
+
+def observe_stage(stage: str, start: Optional[float], end: float):
+    """Record one hop of a trade's journey (epoch seconds in, ms out)"""
+    if start:
+        metrics.observe("trade_stage_ms", max(0.0, (end - start) * 1000), stage=stage)
+
+
+class MetricsServer:
+    """Tiny HTTP endpoint serving the metrics registry"""
+    
+    def __init__(self, port: int = METRICS_PORT, host: str = METRICS_HOST):
+        self.port = port
+        self.host = host
+        self.server: Optional[asyncio.AbstractServer] = None
+    
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        print(f"📈 Metrics on http://{self.host}:{self.port}/metrics")
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode(errors="replace").split()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            
+            path = request_line[1] if len(request_line) > 1 else "/"
+            if path.startswith("/metrics.json") or path == "/":
+                body = json.dumps(metrics.to_json()).encode()
+                content_type = "application/json"
+            elif path.startswith("/metrics"):
+                body = metrics.to_prometheus().encode()
+                content_type = "text/plain; version=0.0.4"
+            else:
+                body, content_type = b"not found", "text/plain"
+            
+            status = "404 Not Found" if body == b"not found" else "200 OK"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except Exception:
+            pass
+        finally:
+            writer.close()
+    
+    async def close(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+
+# =============================================================================
+# HTTP
+# =============================================================================
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    
+    try:
+        from email.utils import parsedate_to_datetime
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = ERROR_BACKOFF_BASE,
+                  cap: float = ERROR_BACKOFF_MAX) -> float:
+    """Exponential backoff with jitter, between half and all of base * 2^attempt"""
+    delay = min(cap, base * (2 ** max(0, attempt)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class RateLimiter:
+    """Token bucket shared by every API call, paused globally on 429s"""
+    
+    def __init__(self, rate: float = API_RATE_LIMIT, burst: float = API_RATE_BURST):
+        self.rate = max(0.01, rate)
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.throttled = 0  # Consecutive 429s
+    
+    async def acquire(self, tokens: float = 1.0):
+        """Wait for a request slot; callers queue by reserving ahead"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= tokens
+        
+        wait = max(-self.tokens / self.rate, self.blocked_until - now)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        
+        # A 429 may have paused everyone while we were queued
+        while self.blocked_for() > 0:
+            await asyncio.sleep(self.blocked_for())
+    
+    def penalize(self, retry_after: Optional[float] = None) -> float:
+        """Pause all callers after a 429, honoring Retry-After when given.
+        
+        429s arriving during a pause come from requests that were already in
+        flight; they may lengthen it to their Retry-After but don't escalate.
+        """
+        now = time.monotonic()
+        if now < self.blocked_until:
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+            return self.blocked_until - now
+        
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0.0, 0.5)
+        else:
+            delay = backoff_delay(self.throttled, base=1.0)
+        self.throttled += 1
+        self.blocked_until = now + delay
+        print(f"⏳ Rate limited, pausing API calls for {delay:.1f}s")
+        return delay
+    
+    def record_success(self):
+        self.throttled = 0
+    
+    def blocked_for(self) -> float:
+        return max(0.0, self.blocked_until - time.monotonic())
+
+
+rate_limiter = RateLimiter()
+
+
+async def _rate_limit_request(request: httpx.Request):
+    await rate_limiter.acquire()
+
+
+async def _rate_limit_response(response: httpx.Response):
+    metrics.inc("api_requests_total", host=response.request.url.host,
+                status=f"{response.status_code // 100}xx")
+    if response.status_code == 429:
+        rate_limiter.penalize(parse_retry_after(response.headers.get("Retry-After")))
+    elif response.status_code < 500:
+        rate_limiter.record_success()
+
+
+def create_http_client(max_connections: int = POLL_CONCURRENCY) -> httpx.AsyncClient:
+    """Pooled keep-alive client (HTTP/2 when h2 is installed) on the shared rate budget"""
+    return httpx.AsyncClient(
+        timeout=30.0,
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=max(1, max_connections),
+            max_keepalive_connections=max(1, max_connections),
+        ),
+        event_hooks={
+            "request": [_rate_limit_request],
+            "response": [_rate_limit_response],
+        },
+    )
+
+
+# =============================================================================
+# STATE STORE
+# =============================================================================
+
+def open_state_db(path: str = STATE_DB_PATH, timeout: float = 30) -> sqlite3.Connection:
+    """Autocommit WAL connection to the state DB, usable from worker threads.
+    
+    timeout is how long a write waits on another process's lock.
+    """
+    db = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=timeout)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+# Shared by SeenTradeStore, which adds detected trades along with their seen
+# rows, and PendingTradeStore, which hands them to the copy workers
+PENDING_TRADES_TABLE = """
+    CREATE TABLE IF NOT EXISTS pending_trades (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,  -- Never reused, so a stale claim can't take a newer trade
+        trade TEXT NOT NULL
+    )
+"""
+
+
+def insert_pending(db: sqlite3.Connection, trades: List[WhaleTrade]):
+    """Add trades to pending_trades within the caller's transaction, setting their row IDs"""
+    for whale_trade in trades:
+        whale_trade.pending_id = db.execute(
+            "INSERT INTO pending_trades (trade) VALUES (?)", (json.dumps(asdict(whale_trade)),)
+        ).lastrowid
+
+
+class SeenTradeStore:
+    """Persistent seen-trade journal (SQLite WAL) behind a bounded LRU.
+    
+    Each wallet also keeps a high-water-mark timestamp: trades older than it
+    (minus HWM_GRACE_SECONDS for late-indexed fills) are known to be seen
+    without touching the journal, so restarts never replay old trades.
+    """
+    
+    def __init__(self, path: str = STATE_DB_PATH, cache_size: int = SEEN_CACHE_SIZE):
+        self.db = open_state_db(path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS seen_trades (
+                trade_id TEXT PRIMARY KEY,
+                wallet TEXT NOT NULL,
+                timestamp INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS seen_trades_ts ON seen_trades(timestamp)")
+        self.db.execute(PENDING_TRADES_TABLE)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS wallet_cursors (
+                wallet TEXT PRIMARY KEY,
+                timestamp INTEGER NOT NULL
+            )
+        """)
+        # Repair millisecond timestamps journaled before they were normalized
+        self.db.execute("UPDATE wallet_cursors SET timestamp = timestamp / 1000 WHERE timestamp > 1000000000000")
+        self.db.execute("UPDATE seen_trades SET timestamp = timestamp / 1000 WHERE timestamp > 1000000000000")
+        
+        # Writes can wait on other processes' locks, so they run on a thread over their own connection
+        self.writer = open_state_db(path)
+        self.write_lock = threading.Lock()
+        
+        self.cache_size = max(1, cache_size)
+        self.cache: OrderedDict = OrderedDict()
+        self.cursors: Dict[str, int] = dict(
+            self.db.execute("SELECT wallet, timestamp FROM wallet_cursors")
+        )
+        self.writes_since_prune = 0
+        self.prune()
+    
+    def remember(self, trade_id: str):
+        """Mark a trade seen in memory at once; the journal write follows after the poll"""
+        self.cache[trade_id] = None
+        self.cache.move_to_end(trade_id)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+    
+    def reload_cursors(self):
+        """Re-read cursors another instance may have advanced"""
+        self.cursors = dict(self.db.execute("SELECT wallet, timestamp FROM wallet_cursors"))
+    
+    def high_water_mark(self, wallet: str) -> Optional[int]:
+        """Newest trade timestamp processed for a wallet"""
+        return self.cursors.get(wallet)
+    
+    def is_seen(self, trade_id: str, wallet: str, timestamp: int) -> bool:
+        """Check the cursor, then the LRU, then the on-disk journal"""
+        cursor = self.cursors.get(wallet)
+        if cursor is not None and timestamp and timestamp < cursor - HWM_GRACE_SECONDS:
+            return True
+        
+        # Trades parsed by a poll that is still walking pages are only here
+        if trade_id in self.cache:
+            self.cache.move_to_end(trade_id)
+            return True
+        
+        # Nothing newer than the cursor has been journaled yet
+        if cursor is not None and timestamp and timestamp > cursor:
+            return False
+        
+        row = self.db.execute(
+            "SELECT 1 FROM seen_trades WHERE trade_id = ?", (trade_id,)
+        ).fetchone()
+        if row:
+            self.remember(trade_id)
+            return True
+        
+        return False
+    
+    async def mark_seen_many(self, rows: List[tuple], trades: List[WhaleTrade] = ()):
+        """Journal (trade_id, wallet, timestamp) rows and advance cursors.
+        
+        The trades worth copying among them are stored as pending in the
+        same transaction, so a crash can't leave a trade seen but uncopied.
+        They are already in the LRU (see remember). Cursors update at once;
+        the disk write runs on a thread so a wait for the write lock never
+        stalls the event loop.
+        """
+        if not rows:
+            return
+        
+        advanced: Dict[str, int] = {}
+        for trade_id, wallet, timestamp in rows:
+            if timestamp > max(self.cursors.get(wallet, 0), advanced.get(wallet, 0)):
+                advanced[wallet] = timestamp
+        self.cursors.update(advanced)
+        
+        await asyncio.to_thread(self._write, rows, advanced, trades)
+    
+    def _write(self, rows: List[tuple], cursors: Dict[str, int], trades: List[WhaleTrade]):
+        with self.write_lock:
+            with self.writer:
+                # IMMEDIATE takes the write lock up front, so sharded workers wait instead of failing
+                self.writer.execute("BEGIN IMMEDIATE")
+                self.writer.executemany(
+                    "INSERT OR IGNORE INTO seen_trades (trade_id, wallet, timestamp) VALUES (?, ?, ?)",
+                    rows
+                )
+                # MAX keeps a write that lands late from moving a cursor back
+                self.writer.executemany(
+                    "INSERT INTO wallet_cursors (wallet, timestamp) VALUES (?, ?) "
+                    "ON CONFLICT(wallet) DO UPDATE SET timestamp = MAX(timestamp, excluded.timestamp)",
+                    cursors.items()
+                )
+                insert_pending(self.writer, trades)
+            
+            self.writes_since_prune += len(rows)
+            if self.writes_since_prune >= 10000:
+                self.prune()
+    
+    def prune(self):
+        """Drop journal rows older than the retention window"""
+        cutoff = int(time.time() - SEEN_RETENTION_DAYS * 86400)
+        self.writer.execute("DELETE FROM seen_trades WHERE timestamp < ?", (cutoff,))
+        self.writes_since_prune = 0
+    
+    def close(self):
+        self.db.close()
+        # Waits for a write still running on its thread
+        with self.write_lock:
+            self.writer.close()
+
+
+class TradeLedger:
+    """Append-only copied-trade history (SQLite) with running counters.
+    
+    Nothing is kept in memory but the counters; the full history lives on
+    disk for reporting and survives restarts. Today's count for the
+    daily limit is read back from it, so it also survives restarts and
+    failovers and rolls over with the UTC date rather than at a set minute.
+    """
+    
+    def __init__(self, path: str = STATE_DB_PATH):
+        self.db = open_state_db(path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS copied_trades (
+                id INTEGER PRIMARY KEY,
+                timestamp TEXT NOT NULL,
+                whale_address TEXT NOT NULL,
+                market_id TEXT NOT NULL,
+                market_title TEXT NOT NULL,
+                token_id TEXT NOT NULL,
+                side TEXT NOT NULL,
+                outcome TEXT NOT NULL,
+                whale_amount_usd REAL NOT NULL,
+                whale_price REAL NOT NULL,
+                fills INTEGER NOT NULL,
+                our_amount REAL NOT NULL,
+                success INTEGER NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS copied_trades_ts ON copied_trades(timestamp)")
+        
+        # Inserts can wait on other processes' locks, so they run on a thread over their own connection
+        self.writer = open_state_db(path)
+        self.write_lock = threading.Lock()
+        
+        self.day = ""  # UTC date the today count is for
+        self.today = 0
+        
+        # This session
+        self.successful = 0
+        self.failed = 0
+        self.volume_usd = 0.0
+        
+        # All sessions, read once and then kept current
+        row = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(success), 0), COALESCE(SUM(our_amount * success), 0) FROM copied_trades"
+        ).fetchone()
+        self.lifetime_total, self.lifetime_successful, self.lifetime_volume_usd = row
+    
+    async def record(self, copied: CopiedTrade):
+        """Update the counters at once, so the daily limit sees this copy, then append it"""
+        self.lifetime_total += 1
+        if copied.success:
+            if copied.timestamp.startswith(self.day):
+                self.today += 1
+            self.successful += 1
+            self.volume_usd += copied.our_amount
+            self.lifetime_successful += 1
+            self.lifetime_volume_usd += copied.our_amount
+        else:
+            self.failed += 1
+        
+        await asyncio.to_thread(self._insert, copied)
+    
+    def _insert(self, copied: CopiedTrade):
+        whale_trade = copied.whale_trade
+        with self.write_lock:
+            self.writer.execute(
+                "INSERT INTO copied_trades (timestamp, whale_address, market_id, market_title, token_id, "
+                "side, outcome, whale_amount_usd, whale_price, fills, our_amount, success) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (copied.timestamp, whale_trade.whale_address, whale_trade.market_id,
+                 whale_trade.market_title, whale_trade.token_id, whale_trade.side, whale_trade.outcome,
+                 whale_trade.amount_usd, whale_trade.price, whale_trade.fills,
+                 copied.our_amount, int(copied.success))
+            )
+    
+    def trades_today(self) -> int:
+        """Successful copies since midnight UTC, by any instance sharing the ledger"""
+        day = datetime.now(timezone.utc).date().isoformat()
+        if day != self.day:
+            self.day = day
+            # Ledger timestamps are UTC ISO strings, so they sort by date
+            self.today = self.db.execute(
+                "SELECT COALESCE(SUM(success), 0) FROM copied_trades WHERE timestamp >= ?", (day,)
+            ).fetchone()[0]
+        return self.today
+    
+    def reload_today(self):
+        """Recount today's copies on the next read, after another instance wrote some"""
+        self.day = ""
+    
+    def close(self):
+        self.db.close()
+        # Waits for an insert still running on its thread
+        with self.write_lock:
+            self.writer.close()
+
+
+class PendingTradeStore:
+    """Trades detected but not yet taken by a copy worker (SQLite).
+    
+    Fills are added by SeenTradeStore in the transaction that journals them
+    as seen, before coalescing, and outlive a restart or failover, so
+    whichever instance leads next copies them. A worker deletes the row
+    before sending the order: a crash mid-order loses that one copy instead
+    of doubling it.
+    """
+    
+    def __init__(self, path: str = STATE_DB_PATH):
+        self.db = open_state_db(path)
+        self.db.execute(PENDING_TRADES_TABLE)
+        # Every call runs on a thread, since writes can wait on other processes' locks;
+        # the lock keeps them from sharing the connection's transaction
+        self.lock = threading.Lock()
+    
+    async def merge(self, row_ids: List[int], merged: Optional[WhaleTrade]) -> bool:
+        """Swap fills' rows for the trade they netted into (None if flat) in one transaction.
+        
+        False, with nothing changed, if another instance already took one of the fills.
+        """
+        return await asyncio.to_thread(self._merge, row_ids, merged)
+    
+    def _merge(self, row_ids: List[int], merged: Optional[WhaleTrade]) -> bool:
+        with self.lock, self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            deleted = self.db.executemany(
+                "DELETE FROM pending_trades WHERE id = ?", [(row_id,) for row_id in row_ids]
+            ).rowcount
+            if deleted < len(row_ids):
+                self.db.execute("ROLLBACK")
+                return False
+            
+            if merged is not None:
+                insert_pending(self.db, [merged])
+        return True
+    
+    async def claim(self, row_id: int) -> bool:
+        """Remove a trade for copying; False if someone else already took it"""
+        return await asyncio.to_thread(self._claim, row_id)
+    
+    def _claim(self, row_id: int) -> bool:
+        with self.lock:
+            return self.db.execute("DELETE FROM pending_trades WHERE id = ?", (row_id,)).rowcount == 1
+    
+    async def load(self) -> List[WhaleTrade]:
+        """Every stored trade, oldest first"""
+        return await asyncio.to_thread(self._load)
+    
+    def _load(self) -> List[WhaleTrade]:
+        trades = []
+        with self.lock:
+            for row_id, data in self.db.execute("SELECT id, trade FROM pending_trades ORDER BY id").fetchall():
+                try:
+                    trades.append(replace(WhaleTrade(**json.loads(data)), pending_id=row_id))
+                except (TypeError, ValueError):
+                    self.db.execute("DELETE FROM pending_trades WHERE id = ?", (row_id,))
+        return trades
+    
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class LeaderLease:
+    """Leader election between instances sharing the state DB.
+    
+    The leader renews a short lease; standbys take it over once it lapses.
+    The leader stops copying at the expiry it last wrote, which is before
+    any standby may take the lease, so two instances never copy at once.
+    """
+    
+    def __init__(self, path: str = STATE_DB_PATH, ttl: float = LEASE_TTL_SECONDS):
+        # Waiting on the lock longer than the lease is pointless
+        self.db = open_state_db(path, timeout=ttl)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS leader_lease (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                holder TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        
+        self.ttl = ttl
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{random.getrandbits(32):08x}"
+        self.valid_until = 0.0  # Epoch seconds our lease is good until
+        self.lock = threading.Lock()  # Updates run on threads
+    
+    async def try_acquire(self) -> bool:
+        """Take the lease if it is free or lapsed, or renew it; True while we hold it.
+        
+        Runs on a thread: a renewal stuck on the lock must not stall the
+        event loop, and the expiry it writes counts from before the wait.
+        """
+        return await asyncio.to_thread(self._try_acquire)
+    
+    def _try_acquire(self) -> bool:
+        now = time.time()
+        try:
+            with self.lock, self.db:
+                self.db.execute("BEGIN IMMEDIATE")
+                row = self.db.execute("SELECT holder, expires_at FROM leader_lease WHERE id = 1").fetchone()
+                if row and row[0] != self.holder and row[1] > now:
+                    self.valid_until = 0.0
+                    return False
+                self.db.execute(
+                    "INSERT OR REPLACE INTO leader_lease (id, holder, expires_at) VALUES (1, ?, ?)",
+                    (self.holder, now + self.ttl)
+                )
+        except sqlite3.Error as e:
+            # A renewal that could not be written leaves the current lease to run out
+            print(f"⚠️  Lease update failed: {e}")
+            return self.is_held()
+        
+        self.valid_until = now + self.ttl
+        return True
+    
+    def is_held(self) -> bool:
+        return time.time() < self.valid_until
+    
+    async def release(self):
+        """Hand the lease over at once instead of letting it lapse"""
+        if not self.is_held():
+            return
+        self.valid_until = 0.0
+        await asyncio.to_thread(self._release)
+    
+    def _release(self):
+        try:
+            with self.lock:
+                self.db.execute("DELETE FROM leader_lease WHERE id = 1 AND holder = ?", (self.holder,))
+        except sqlite3.Error as e:
+            print(f"⚠️  Could not release the lease: {e}")
+    
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+# =============================================================================
+# POSITIONS
+# =============================================================================
+
+class PositionBook:
+    """Our positions by token and cost basis by market, kept in memory.
+    
+    Fills update it incrementally, so SELL sizing and exposure checks never
+    touch the network. A periodic Data API snapshot corrects drift, except
+    on tokens we traded within POSITION_INDEX_LAG_SECONDS of fetching it:
+    the snapshot may or may not include those fills yet, so they keep the
+    position our own fills give.
+    """
+    
+    def __init__(self, max_market_exposure: float = MAX_MARKET_EXPOSURE_USD):
+        self.max_market_exposure = max_market_exposure
+        self.positions: Dict[str, Position] = {}
+        self.exposure: Dict[str, float] = {}  # market_id -> cost basis USD
+        self.reserved_shares: Dict[str, float] = {}  # token_id -> shares in pending SELLs
+        self.reserved_usd: Dict[str, float] = {}  # market_id -> USD in pending BUYs
+        self.filled_at: Dict[str, float] = {}  # token_id -> epoch seconds of our last fill
+    
+    def shares(self, token_id: str) -> float:
+        """Shares held and not already committed to a pending SELL"""
+        position = self.positions.get(token_id)
+        if position is None:
+            return 0.0
+        return max(0.0, position.size - self.reserved_shares.get(token_id, 0.0))
+    
+    def sell_size(self, token_id: str, shares: float) -> float:
+        """Shares we can actually sell, at most what we hold"""
+        return min(shares, self.shares(token_id))
+    
+    def buy_size(self, market_id: str, amount_usd: float) -> float:
+        """USD we may still put into a market under the exposure cap"""
+        if self.max_market_exposure <= 0 or not market_id:
+            return amount_usd
+        used = self.exposure.get(market_id, 0.0) + self.reserved_usd.get(market_id, 0.0)
+        return max(0.0, min(amount_usd, self.max_market_exposure - used))
+    
+    def reserve(self, token_id: str, market_id: str, side: str, amount: float):
+        """Hold back shares (SELL) or exposure (BUY) while an order is in flight"""
+        if side == SELL:
+            self.reserved_shares[token_id] = self.reserved_shares.get(token_id, 0.0) + amount
+        elif market_id:
+            self.reserved_usd[market_id] = self.reserved_usd.get(market_id, 0.0) + amount
+    
+    def release(self, token_id: str, market_id: str, side: str, amount: float):
+        reserved, key = (self.reserved_shares, token_id) if side == SELL else (self.reserved_usd, market_id)
+        if not key:
+            return
+        remaining = reserved.get(key, 0.0) - amount
+        if remaining > 1e-9:
+            reserved[key] = remaining
+        else:
+            reserved.pop(key, None)
+    
+    def apply_fill(self, token_id: str, market_id: str, side: str, shares: float, usd: float):
+        """Update the book from one of our fills"""
+        self.filled_at[token_id] = time.time()
+        position = self.positions.get(token_id)
+        if position is None:
+            if side != BUY:
+                return
+            position = self.positions[token_id] = Position(token_id=token_id, market_id=market_id)
+        market_id = position.market_id or market_id
+        position.market_id = market_id
+        
+        if side == BUY:
+            position.size += shares
+            cost_change = usd
+        else:
+            sold = min(shares, position.size)
+            cost_change = -position.cost_usd * (sold / position.size) if position.size > 0 else 0.0
+            position.size -= sold
+        
+        position.cost_usd += cost_change
+        if market_id:
+            exposure = self.exposure.get(market_id, 0.0) + cost_change
+            if exposure > 1e-9:
+                self.exposure[market_id] = exposure
+            else:
+                self.exposure.pop(market_id, None)
+        
+        if position.size <= 1e-9:
+            del self.positions[token_id]
+    
+    def reconcile(self, items: list, fetched_at: float):
+        """Merge a Data API /positions snapshot fetched at fetched_at (epoch seconds)"""
+        horizon = fetched_at - POSITION_INDEX_LAG_SECONDS
+        self.filled_at = {token_id: at for token_id, at in self.filled_at.items() if at >= horizon}
+        positions = {token_id: position for token_id, position in self.positions.items()
+                     if token_id in self.filled_at}
+        
+        for item in items:
+            token_id = item.get("asset")
+            size = float(item.get("size") or 0)
+            if not token_id or size <= 0 or token_id in self.filled_at:
+                continue
+            cost = item.get("initialValue")
+            cost = float(cost) if cost is not None else size * float(item.get("avgPrice") or 0)
+            positions[token_id] = Position(token_id=token_id, market_id=item.get("conditionId", ""),
+                                           size=size, cost_usd=cost)
+        
+        self.positions = positions
+        self.exposure = {}
+        for position in positions.values():
+            if position.market_id:
+                self.exposure[position.market_id] = self.exposure.get(position.market_id, 0.0) + position.cost_usd
+    
+    def total_exposure(self) -> float:
+        return sum(self.exposure.values())
+
+
+def fill_amounts(side: str, response, amount: float, price: float) -> tuple:
+    """(shares, usd) actually filled, from the order response if it says.
+    
+    BUY orders give USD and receive shares, SELL orders the reverse.
+    """
+    making = taking = None
+    if isinstance(response, dict):
+        try:
+            making = float(response.get("makingAmount") or 0) or None
+            taking = float(response.get("takingAmount") or 0) or None
+        except (TypeError, ValueError):
+            pass
+    
+    if side == BUY:
+        usd = making or amount
+        shares = taking or (usd / price if price > 0 else 0.0)
+    else:
+        shares = making or amount
+        usd = taking or shares * price
+    return shares, usd
+
+
+# =============================================================================
+# METADATA CACHE
+# =============================================================================
+
+class MetadataCache:
+    """TTL + LRU cache with single-flight loading and JSON snapshots.
+    
+    Concurrent lookups of the same key share one in-flight fetch. Expiry uses
+    wall-clock time so snapshots stay meaningful across restarts.
+    """
+    
+    def __init__(self, name: str, ttl: float, max_entries: int = METADATA_CACHE_SIZE):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.entries: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get_cached(self, key: str) -> Optional[dict]:
+        """Fresh cached value or None, without fetching"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        
+        if entry[0] < time.time():
+            del self.entries[key]
+            return None
+        
+        self.entries.move_to_end(key)
+        return entry[1]
+    
+    def put(self, key: str, value: dict, expires_at: Optional[float] = None):
+        self.entries[key] = (expires_at or time.time() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+    
+    async def get(self, key: str, loader: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        """Cached value, or load it once no matter how many callers ask"""
+        value = self.get_cached(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        
+        if key in self.inflight:
+            return await asyncio.shield(self.inflight[key])
+        
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        value = None
+        try:
+            value = await loader()
+            if value is not None:
+                self.put(key, value)
+        finally:
+            del self.inflight[key]
+            future.set_result(value)
+        
+        return value
+    
+    def missing(self, keys) -> List[str]:
+        """Keys neither cached nor being fetched"""
+        return [key for key in dict.fromkeys(keys)
+                if key and key not in self.inflight and self.get_cached(key) is None]
+    
+    def to_snapshot(self) -> dict:
+        now = time.time()
+        return {key: [expires_at, value] for key, (expires_at, value) in self.entries.items()
+                if expires_at > now}
+    
+    def load_snapshot(self, snapshot: dict):
+        now = time.time()
+        for key, (expires_at, value) in snapshot.items():
+            if expires_at > now:
+                self.put(key, value, expires_at)
+
+
+# =============================================================================
+# ORDER EXECUTION
+# =============================================================================
+
+class OrderExecutor:
+    """Signs and posts orders on a bounded thread pool so the event loop never blocks"""
+    
+    def __init__(self, max_workers: int = ORDER_WORKERS):
+        self.pool = ThreadPoolExecutor(
+            max_workers=max(1, max_workers),
+            thread_name_prefix="order"
+        )
+        self.in_flight = 0
+    
+    @staticmethod
+    def _sign(clob_client, order_args, meta: Optional[dict]):
+        """Sign through py-clob-client, passing the token metadata we already hold.
+        
+        The client still checks tick size and fee rate against the market,
+        from its own per-token cache.
+        """
+        if not meta:
+            return clob_client.create_market_order(order_args)
+        
+        order_args.fee_rate_bps = meta["fee_rate_bps"]
+        return clob_client.create_market_order(
+            order_args,
+            PartialCreateOrderOptions(tick_size=meta["tick_size"], neg_risk=meta["neg_risk"])
+        )
+    
+    @staticmethod
+    def _execute(clob_client, order_args, meta: Optional[dict], submitted_at: float) -> OrderResult:
+        """Runs on a worker thread: sign, then post as FOK"""
+        started = time.perf_counter()
+        result = OrderResult(
+            success=False,
+            side=order_args.side,
+            token_id=order_args.token_id,
+            amount=order_args.amount,
+            queue_ms=(started - submitted_at) * 1000
+        )
+        
+        try:
+            signed_order = OrderExecutor._sign(clob_client, order_args, meta)
+            signed_at = time.perf_counter()
+            result.sign_ms = (signed_at - started) * 1000
+            
+            response = clob_client.post_order(signed_order, OrderType.FOK)
+            result.post_ms = (time.perf_counter() - signed_at) * 1000
+            result.response = response
+            
+            # The CLOB can answer 200 with success=false (e.g. FOK not filled)
+            if isinstance(response, dict) and not response.get("success", True):
+                result.error = response.get("errorMsg") or "order rejected"
+            else:
+                result.success = True
+        except Exception as e:
+            result.error = str(e)
+            result.status_code = getattr(e, "status_code", None)
+        
+        return result
+    
+    async def submit(self, clob_client, token_id: str, amount: float, side: str,
+                     meta: Optional[dict] = None, price: float = 0.0) -> OrderResult:
+        """Sign and post a FOK market order without blocking the event loop.
+        
+        A price (worst acceptable fill) skips the order book fetch that
+        py-clob-client would otherwise make to pick one.
+        """
+        order_args = MarketOrderArgs(
+            token_id=token_id,
+            amount=amount,
+            side=side,
+            price=price,
+        )
+        
+        loop = asyncio.get_running_loop()
+        submitted_at = time.perf_counter()
+        await rate_limiter.acquire()
+        self.in_flight += 1
+        try:
+            result = await loop.run_in_executor(
+                self.pool, self._execute, clob_client, order_args, meta, submitted_at
+            )
+        finally:
+            self.in_flight -= 1
+        
+        result.ack_ms = (time.perf_counter() - submitted_at) * 1000
+        
+        if result.status_code == 429:
+            rate_limiter.penalize()
+        
+        return result
+    
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+# =============================================================================
+# POLYMARKET CLIENT
+# =============================================================================
+
+def load_api_creds(path: str, address: str, host: str) -> Optional["ApiCreds"]:
+    """Cached L2 API creds for this signer and CLOB host, if any"""
+    if not path or not os.path.exists(path):
+        return None
+    
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+        if cached.get("address", "").lower() != address.lower() or cached.get("host") != host:
+            return None
+        return ApiCreds(
+            api_key=cached["apiKey"],
+            api_secret=cached["secret"],
+            api_passphrase=cached["passphrase"],
+        )
+    except Exception as e:
+        print(f"⚠️  Ignoring unreadable API creds cache: {e}")
+        return None
+
+
+def save_api_creds(path: str, address: str, host: str, creds: "ApiCreds"):
+    """Write API creds readable by the owner only (atomic replace)"""
+    if not path:
+        return
+    
+    try:
+        tmp_path = f"{path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({
+                "address": address,
+                "host": host,
+                "apiKey": creds.api_key,
+                "secret": creds.api_secret,
+                "passphrase": creds.api_passphrase,
+            }, f)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"⚠️  Could not cache API creds: {e}")
+
+
+class PolymarketTrader:
+    """Handles all Polymarket trading operations"""
+    
+    def __init__(self, http: Optional[httpx.AsyncClient] = None):
+        self.owns_http = http is None
+        self.http = http or create_http_client()
+        self.clob_client = None
+        self.initialized = False
+        self.markets = MetadataCache("markets", ttl=MARKET_CACHE_TTL)
+        self.tokens = MetadataCache("tokens", ttl=TOKEN_CACHE_TTL)
+        self.load_metadata()
+        self.executor = OrderExecutor()
+        self.positions = PositionBook()
+        self.account = POLY_FUNDER_ADDRESS  # Wallet holding our positions
+    
+    async def initialize(self):
+        """Initialize trading client"""
+        if not POLY_PRIVATE_KEY:
+            print("❌ No private key configured!")
+            return False
+        
+        if ClobClient is None:
+            print("❌ py-clob-client is not installed!")
+            return False
+        
+        # Client setup (creds from disk or the network) overlaps with opening connections
+        try:
+            await asyncio.gather(asyncio.to_thread(self._init_client), self.warm_connections())
+            self.account = (POLY_FUNDER_ADDRESS or self.clob_client.get_address()).lower()
+            self.initialized = True
+            print("✅ Trading client initialized")
+            return True
+        except Exception as e:
+            print(f"❌ Init error: {e}")
+            return False
+    
+    def _init_client(self):
+        """Runs on a worker thread: build the client with cached or derived API creds.
+        
+        Cached creds are not checked here; a 401 on an order re-derives them.
+        """
+        self.clob_client = ClobClient(
+            POLYMARKET_CLOB,
+            key=POLY_PRIVATE_KEY,
+            chain_id=137,
+            signature_type=POLY_SIGNATURE_TYPE,
+            funder=POLY_FUNDER_ADDRESS
+        )
+        
+        creds = load_api_creds(API_CREDS_PATH, self.clob_client.get_address(), POLYMARKET_CLOB)
+        if creds:
+            print("🔑 Using cached API credentials")
+        else:
+            creds = self._derive_creds()
+        self.clob_client.set_api_creds(creds)
+    
+    def _derive_creds(self) -> "ApiCreds":
+        creds = self.clob_client.create_or_derive_api_creds()
+        save_api_creds(API_CREDS_PATH, self.clob_client.get_address(), POLYMARKET_CLOB, creds)
+        print("🔑 Derived API credentials")
+        return creds
+    
+    async def refresh_creds(self):
+        """Re-derive API creds after the CLOB rejected the cached ones"""
+        creds = await asyncio.to_thread(self._derive_creds)
+        self.clob_client.set_api_creds(creds)
+    
+    async def warm_connections(self):
+        """Open keep-alive connections to the Data, Gamma and CLOB hosts before they are needed"""
+        async def connect(url: str):
+            try:
+                await self.http.get(url)  # Any answer means the connection is up
+            except Exception:
+                pass
+        
+        await asyncio.gather(*(connect(f"{base}/") for base in (POLYMARKET_DATA, POLYMARKET_GAMMA, POLYMARKET_CLOB)))
+    
+    def _warm_signer(self):
+        """Runs on a worker thread: sign a throwaway order and open the posting connection.
+        
+        The first signature pays one-off EIP-712 and key setup costs, and
+        py-clob-client posts over its own keep-alive client.
+        """
+        self.clob_client.builder.create_market_order(
+            MarketOrderArgs(token_id="1", amount=1.0, side=BUY, price=0.5),
+            CreateOrderOptions(tick_size="0.01", neg_risk=False)
+        )
+        self.clob_client.get_ok()
+    
+    async def warm_signer(self):
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor.pool, self._warm_signer)
+        except Exception as e:
+            print(f"⚠️  Signer warm-up failed: {e}")
+    
+    def load_metadata(self, path: str = METADATA_CACHE_PATH):
+        """Warm the metadata caches from the last snapshot"""
+        if not path or not os.path.exists(path):
+            return
+        
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+            self.markets.load_snapshot(snapshot.get("markets", {}))
+            self.tokens.load_snapshot(snapshot.get("tokens", {}))
+            print(f"📦 Loaded metadata cache: {len(self.markets.entries)} markets, {len(self.tokens.entries)} tokens")
+        except Exception as e:
+            print(f"⚠️  Could not load metadata cache: {e}")
+    
+    def save_metadata(self, path: str = METADATA_CACHE_PATH):
+        """Snapshot the metadata caches to disk (atomic replace)"""
+        if not path:
+            return
+        
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({
+                    "markets": self.markets.to_snapshot(),
+                    "tokens": self.tokens.to_snapshot(),
+                }, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"⚠️  Could not save metadata cache: {e}")
+    
+    async def _fetch_market(self, condition_id: str) -> Optional[dict]:
+        try:
+            response = await self.http.get(
+                f"{POLYMARKET_GAMMA}/markets/{condition_id}"
+            )
+            if response.status_code == 200:
+                return response.json()
+        except:
+            pass
+        
+        return None
+    
+    async def get_market_info(self, condition_id: str) -> Optional[dict]:
+        """Get market info by condition ID"""
+        return await self.markets.get(condition_id, lambda: self._fetch_market(condition_id))
+    
+    async def _fetch_token(self, token_id: str) -> Optional[dict]:
+        try:
+            tick, neg_risk, fee = await asyncio.gather(
+                self.http.get(f"{POLYMARKET_CLOB}/tick-size", params={"token_id": token_id}),
+                self.http.get(f"{POLYMARKET_CLOB}/neg-risk", params={"token_id": token_id}),
+                self.http.get(f"{POLYMARKET_CLOB}/fee-rate", params={"token_id": token_id}),
+            )
+            if tick.status_code == 200 and neg_risk.status_code == 200:
+                return {
+                    "tick_size": str(tick.json()["minimum_tick_size"]),
+                    "neg_risk": bool(neg_risk.json()["neg_risk"]),
+                    "fee_rate_bps": (fee.json().get("base_fee") or 0) if fee.status_code == 200 else 0,
+                }
+        except:
+            pass
+        
+        return None
+    
+    async def get_token_info(self, token_id: str) -> Optional[dict]:
+        """CLOB order metadata for a token: tick size, neg risk and fee rate"""
+        return await self.tokens.get(token_id, lambda: self._fetch_token(token_id))
+    
+    async def prefetch(self, condition_ids: List[str], token_ids: List[str]):
+        """Batch-load metadata for markets we are likely to trade soon"""
+        missing_markets = self.markets.missing(condition_ids)
+        
+        # Gamma accepts many condition_ids per request
+        for i in range(0, len(missing_markets), 20):
+            chunk = missing_markets[i:i + 20]
+            try:
+                response = await self.http.get(
+                    f"{POLYMARKET_GAMMA}/markets",
+                    params=[("condition_ids", condition_id) for condition_id in chunk]
+                )
+                if response.status_code == 200:
+                    for market in response.json():
+                        if market.get("conditionId"):
+                            self.markets.put(market["conditionId"], market)
+            except Exception as e:
+                print(f"⚠️  Market prefetch failed: {e}")
+        
+        await asyncio.gather(
+            *(self.get_token_info(token_id) for token_id in self.tokens.missing(token_ids))
+        )
+    
+    async def prefetch_whale_positions(self, whale_addresses: List[str]) -> List[str]:
+        """Prefetch metadata for every market the whales currently hold; returns their tokens"""
+        condition_ids: List[str] = []
+        token_ids: List[str] = []
+        
+        for address in whale_addresses:
+            try:
+                response = await self.http.get(
+                    f"{POLYMARKET_DATA}/positions",
+                    params={"user": address, "limit": 100}
+                )
+                if response.status_code == 200:
+                    for position in response.json():
+                        condition_ids.append(position.get("conditionId", ""))
+                        token_ids.append(position.get("asset", ""))
+            except Exception as e:
+                print(f"⚠️  Could not load positions for {address[:10]}...: {e}")
+        
+        await self.prefetch(condition_ids, token_ids)
+        print(f"📦 Prefetched metadata for {len(set(filter(None, token_ids)))} whale tokens")
+        return token_ids
+    
+    async def sync_positions(self) -> bool:
+        """Reconcile the position book with the account's positions"""
+        if not self.account:
+            return False
+        
+        fetched_at = time.time()
+        items = []
+        try:
+            for offset in range(0, 10000, 500):
+                response = await self.http.get(
+                    f"{POLYMARKET_DATA}/positions",
+                    params={"user": self.account, "sizeThreshold": 0, "limit": 500, "offset": offset}
+                )
+                if response.status_code != 200:
+                    raise Exception(f"status {response.status_code}")
+                page = decode_json(response.content)
+                items.extend(page)
+                if len(page) < 500:
+                    break
+        except Exception as e:
+            print(f"⚠️  Could not sync positions: {e}")
+            return False
+        
+        self.positions.reconcile(items, fetched_at)
+        return True
+    
+    async def execute_order(self, token_id: str, amount: float, side: str,
+                            market_id: str = "", price: float = 0.0,
+                            limit_price: float = 0.0) -> OrderResult:
+        """Sign and post a market order on the executor pool.
+        
+        amount is USD for a BUY and shares for a SELL, as the CLOB expects.
+        price is the whale's, used to estimate our fill; limit_price is the
+        worst price the order may fill at (0 = let the client pick).
+        """
+        if not self.initialized:
+            print("❌ Client not initialized")
+            return OrderResult(success=False, side=side, token_id=token_id,
+                               amount=amount, error="client not initialized")
+        
+        meta = await self.get_token_info(token_id)
+        result = await self.executor.submit(self.clob_client, token_id, amount, side,
+                                            meta=meta, price=limit_price)
+        
+        # Cached creds are validated lazily: a 401 re-derives them and retries once
+        if result.status_code == 401:
+            print("🔑 API credentials rejected, re-deriving")
+            try:
+                await self.refresh_creds()
+                result = await self.executor.submit(self.clob_client, token_id, amount, side,
+                                                    meta=meta, price=limit_price)
+            except Exception as e:
+                print(f"❌ Could not re-derive API credentials: {e}")
+        
+        metrics.inc("orders_total", side=side, result="success" if result.success else "failed")
+        for stage, value in (("queue", result.queue_ms), ("sign", result.sign_ms),
+                             ("post", result.post_ms), ("ack", result.ack_ms)):
+            metrics.observe("order_stage_ms", value, stage=stage)
+        
+        if result.success:
+            shares, usd = fill_amounts(side, result.response, amount, price)
+            self.positions.apply_fill(token_id, market_id, side, shares, usd)
+            print(f"✅ {side} order executed: {result.response} ({result.timings()})")
+        else:
+            print(f"❌ {side} order failed: {result.error} ({result.timings()})")
+        
+        return result
+    
+    async def buy(self, token_id: str, amount_usd: float, market_id: str = "", price: float = 0.0,
+                  limit_price: float = 0.0) -> bool:
+        """Execute a market buy order"""
+        self.positions.reserve(token_id, market_id, BUY, amount_usd)
+        try:
+            result = await self.execute_order(token_id, amount_usd, BUY, market_id, price, limit_price)
+        finally:
+            self.positions.release(token_id, market_id, BUY, amount_usd)
+        return result.success
+    
+    async def sell(self, token_id: str, shares: float, market_id: str = "", price: float = 0.0,
+                   limit_price: float = 0.0) -> bool:
+        """Execute a market sell order for a number of shares"""
+        self.positions.reserve(token_id, market_id, SELL, shares)
+        try:
+            result = await self.execute_order(token_id, shares, SELL, market_id, price, limit_price)
+        finally:
+            self.positions.release(token_id, market_id, SELL, shares)
+        return result.success
+    
+    async def close(self):
+        self.executor.shutdown()
+        self.save_metadata()
+        if self.owns_http:
+            await self.http.aclose()
+
+
+# =============================================================================
+# WHALE TRACKER
+# =============================================================================
+
+class WhaleTracker:
+    """Tracks trades from the whale wallet"""
+    
+    def __init__(self, whale_address: str, http: Optional[httpx.AsyncClient] = None,
+                 min_trade_size: float = MIN_WHALE_TRADE_SIZE,
+                 store: Optional[SeenTradeStore] = None):
+        self.whale_address = whale_address.lower()
+        self.min_trade_size = min_trade_size
+        self.owns_http = http is None
+        self.http = http or create_http_client()
+        self.owns_store = store is None
+        self.store = store or SeenTradeStore()
+        self.last_poll_failed = False
+        self.last_fetched = 0  # Trades the last poll downloaded
+    
+    async def _fetch_page(self, limit: int, offset: int) -> Optional[list]:
+        """One page of the whale's trades, newest first"""
+        response = await self.http.get(
+            f"{POLYMARKET_DATA}/trades",
+            params={
+                "proxyWallet": self.whale_address,
+                "limit": limit,
+                "offset": offset
+            }
+        )
+        
+        if response.status_code != 200:
+            print(f"⚠️  API returned status {response.status_code}")
+            return None
+        
+        return decode_json(response.content)
+    
+    def _parse_page(self, data: list, cursor: Optional[int], trades: List[WhaleTrade],
+                    processed: List[tuple], batch_ids: set, seen_at: float) -> bool:
+        """Parse new trades from a page; True once the cursor has been reached"""
+        reached_cursor = False
+        found = len(trades)
+        
+        for item in data:
+            try:
+                # Cursors and the journal are in seconds; one millisecond value would blind the cursor
+                timestamp = int(epoch_seconds(item.get("timestamp")))
+                
+                # Pages are newest first: everything from here on is old
+                if cursor is not None and timestamp and timestamp < cursor - HWM_GRACE_SECONDS:
+                    reached_cursor = True
+                    break
+                
+                trade_id = trade_id_of(item)
+                
+                if trade_id in batch_ids or self.store.is_seen(trade_id, self.whale_address, timestamp):
+                    if cursor is not None and timestamp <= cursor:
+                        reached_cursor = True
+                    continue
+                batch_ids.add(trade_id)
+                processed.append((trade_id, self.whale_address, timestamp))
+                # Seen from now on, so the stream can't copy it again while later pages load
+                self.store.remember(trade_id)
+                
+                trade = parse_trade(item, self.min_trade_size, self.whale_address)
+                if trade is None:
+                    continue
+                
+                trade.seen_at = seen_at
+                trade.detected_at = time.time()
+                observe_stage("chain_to_api", chain_epoch(trade), seen_at)
+                observe_stage("api_to_detect", seen_at, trade.detected_at)
+                
+                trades.append(trade)
+                
+            except (TypeError, ValueError, AttributeError):
+                metrics.inc("trades_rejected_total", reason="malformed")
+                continue
+        
+        if len(trades) > found:
+            metrics.inc("trades_detected_total", len(trades) - found)
+        return reached_cursor
+    
+    async def get_recent_trades(self) -> List[WhaleTrade]:
+        """Fetch trades newer than the wallet's cursor from the Data API.
+        
+        With a cursor the first page is small; if a burst fills it, pages
+        grow and walk backwards until the cursor is reached.
+        """
+        trades = []
+        
+        # Everything examined is journaled, including filtered-out trades,
+        # so later polls skip them without re-parsing
+        processed = []
+        batch_ids = set()
+        
+        cursor = self.store.high_water_mark(self.whale_address)
+        limit = INCREMENTAL_PAGE_SIZE if cursor is not None else TRADES_PAGE_SIZE
+        offset = 0
+        fetched = 0
+        self.last_poll_failed = False
+        
+        try:
+            for _ in range(MAX_PAGES_PER_POLL):
+                data = await self._fetch_page(limit, offset)
+                if data is None:
+                    self.last_poll_failed = True
+                    break
+                fetched += len(data)
+                
+                reached_cursor = self._parse_page(data, cursor, trades, processed, batch_ids, time.time())
+                
+                # Without a cursor only the latest page is considered, as on a fresh start
+                if reached_cursor or cursor is None or len(data) < limit:
+                    break
+                
+                offset += limit
+                limit = min(limit * 4, MAX_TRADES_PAGE_SIZE)
+            else:
+                print(f"⚠️  Burst exceeded {MAX_PAGES_PER_POLL} pages for {self.whale_address[:10]}..., older trades skipped")
+        except Exception as e:
+            self.last_poll_failed = True
+            metrics.inc("api_errors_total", kind=type(e).__name__)
+            print(f"❌ Error fetching trades: {e}")
+        
+        await self.store.mark_seen_many(processed, trades)
+        self.last_fetched = fetched
+        return trades
+    
+    async def ingest(self, items: list) -> List[WhaleTrade]:
+        """Run pushed trade events through the same dedupe and filters as polling"""
+        trades = []
+        processed = []
+        self._parse_page(items, None, trades, processed, set(), time.time())
+        await self.store.mark_seen_many(processed, trades)
+        return trades
+    
+    async def close(self):
+        if self.owns_http:
+            await self.http.aclose()
+        if self.owns_store:
+            self.store.close()
+
+
+class MultiWhaleTracker:
+    """Polls many whale wallets concurrently over one shared connection pool"""
+    
+    def __init__(self, whales: List[WhaleConfig], concurrency: int = POLL_CONCURRENCY,
+                 http: Optional[httpx.AsyncClient] = None):
+        self.whales = {whale.address: whale for whale in whales}
+        self.owns_http = http is None
+        self.http = http or create_http_client(concurrency)
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.failed_polls = 0
+        self.store = SeenTradeStore()
+        self.trackers = [
+            WhaleTracker(whale.address, http=self.http, min_trade_size=whale.min_trade_size,
+                         store=self.store)
+            for whale in whales
+        ]
+    
+    async def _poll(self, tracker: WhaleTracker,
+                    on_trades: Optional[Callable[[List[WhaleTrade]], Awaitable[None]]]) -> List[WhaleTrade]:
+        async with self.semaphore:
+            trades = await tracker.get_recent_trades()
+        
+        # Handed on as soon as this wallet is done; a scan of many wallets takes seconds
+        if trades and on_trades:
+            await on_trades(trades)
+        return trades
+    
+    async def get_recent_trades(self, on_trades: Optional[Callable[[List[WhaleTrade]], Awaitable[None]]] = None
+                                ) -> List[WhaleTrade]:
+        """Fetch new trades from every wallet at once, passing each wallet's to on_trades as it finishes"""
+        results = await asyncio.gather(
+            *(self._poll(tracker, on_trades) for tracker in self.trackers),
+            return_exceptions=True
+        )
+        
+        trades = []
+        fetched = 0
+        self.failed_polls = 0
+        for tracker, result in zip(self.trackers, results):
+            if isinstance(result, Exception):
+                self.failed_polls += 1
+                print(f"❌ Error polling {tracker.whale_address[:10]}...: {result}")
+                continue
+            if tracker.last_poll_failed:
+                self.failed_polls += 1
+            fetched += tracker.last_fetched
+            trades.extend(result)
+        
+        # One line per scan rather than one per wallet
+        if fetched:
+            print(f"📡 Fetched {fetched} trades from API ({len(self.trackers)} wallet(s))")
+        
+        return trades
+    
+    async def close(self):
+        if self.owns_http:
+            await self.http.aclose()
+        self.store.close()
+
+
+# =============================================================================
+# TRADE STREAM
+# =============================================================================
+
+class TradeStream:
+    """Push-based trade feed from the Polymarket real-time data socket.
+    
+    Events for watched wallets go through WhaleTracker.ingest, so they share
+    dedupe with the poller. Reconnects with backoff; `connected` tells the
+    main loop whether it must fall back to full-speed polling.
+    """
+    
+    WALLET_KEY = '"proxyWallet"'
+    
+    def __init__(self, trackers: List[WhaleTracker],
+                 on_trades: Callable[[List[WhaleTrade]], Awaitable[None]],
+                 url: str = STREAM_URL):
+        self.trackers = {tracker.whale_address: tracker for tracker in trackers}
+        self.on_trades = on_trades
+        self.url = url
+        self.connected = False
+        self.state_changed = asyncio.Event()
+        self.running = False
+    
+    def _set_connected(self, connected: bool):
+        if connected != self.connected:
+            self.connected = connected
+            self.state_changed.set()
+    
+    def _watched_wallet(self, message: str) -> Optional[str]:
+        """Cheap pre-filter: pull proxyWallet out of the raw text before decoding"""
+        key = message.find(self.WALLET_KEY)
+        if key < 0:
+            return None
+        start = message.find('"', key + len(self.WALLET_KEY)) + 1
+        wallet = message[start:start + 42].lower()
+        return wallet if wallet in self.trackers else None
+    
+    async def _handle(self, message: str):
+        wallet = self._watched_wallet(message)
+        if wallet is None:
+            return
+        
+        event = decode_json(message)
+        payload = event.get("payload", event)
+        items = payload if isinstance(payload, list) else [payload]
+        
+        trades = await self.trackers[wallet].ingest(
+            [item for item in items if str(item.get("proxyWallet", "")).lower() == wallet]
+        )
+        if trades:
+            print(f"⚡ Streamed {len(trades)} new trade(s) from {wallet[:10]}...")
+            await self.on_trades(trades)
+    
+    async def run(self):
+        """Consume the socket until stopped, reconnecting on drops"""
+        if websockets is None:
+            print("⚠️  websockets not installed, streaming disabled")
+            return
+        
+        self.running = True
+        attempt = 0
+        
+        while self.running:
+            try:
+                async with websockets.connect(self.url, ping_interval=5, ping_timeout=10) as ws:
+                    await ws.send(json.dumps({
+                        "action": "subscribe",
+                        "subscriptions": [{"topic": "activity", "type": "trades"}]
+                    }))
+                    self._set_connected(True)
+                    attempt = 0
+                    print("⚡ Trade stream connected")
+                    
+                    async for message in ws:
+                        if isinstance(message, bytes):
+                            message = message.decode()
+                        try:
+                            await self._handle(message)
+                        except Exception as e:
+                            print(f"⚠️  Error handling stream event: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Trade stream error: {e}")
+            finally:
+                self._set_connected(False)
+            
+            if self.running:
+                delay = backoff_delay(attempt, base=1.0, cap=30.0)
+                attempt += 1
+                print(f"🔌 Trade stream down, polling until reconnect (retry in {delay:.1f}s)")
+                await asyncio.sleep(delay)
+    
+    def stop(self):
+        self.running = False
+
+
 # =============================================================================
-# POLYMARKET CLIENT
+# ORDER BOOKS
 # =============================================================================
 
-class PolymarketTrader:
-    """Handles all Polymarket trading operations"""
+class BookCache:
+    """Local order books for the tokens we are likely to copy.
     
-    def __init__(self):
-        self.http = httpx.AsyncClient(timeout=30.0)
-        self.clob_client = None
-        self.initialized = False
-        self.markets_cache: Dict[str, dict] = {}
+    Books are seeded from CLOB /books snapshots and kept current by the
+    market channel socket ("book" snapshots plus "price_change" deltas).
+    While the socket is down, tracked books are re-snapshotted every
+    BOOK_MAX_AGE_SECONDS. Slippage checks read memory only.
+    """
     
-    async def initialize(self):
-        """Initialize trading client"""
-        if not POLY_PRIVATE_KEY:
-            print("❌ No private key configured!")
-            return False
+    def __init__(self, http: httpx.AsyncClient, url: str = BOOK_STREAM_URL,
+                 max_books: int = BOOK_CACHE_SIZE, max_age: float = BOOK_MAX_AGE_SECONDS):
+        self.http = http
+        self.url = url
+        self.max_books = max(1, max_books)
+        self.max_age = max_age
+        self.books: OrderedDict = OrderedDict()  # token_id -> LocalBook, or None until loaded
+        self.pending: List[str] = []  # Tracked but not yet subscribed on the socket
+        self.subscribe_ready = asyncio.Event()
+        self.connected = False
+        self.running = False
+    
+    def track(self, token_ids: List[str]) -> List[str]:
+        """Keep these tokens' books fresh; returns the ones not tracked before"""
+        new = []
+        for token_id in token_ids:
+            if not token_id:
+                continue
+            if token_id in self.books:
+                self.books.move_to_end(token_id)
+                continue
+            self.books[token_id] = None
+            new.append(token_id)
         
-        try:
-            from py_clob_client.client import ClobClient
-            
-            self.clob_client = ClobClient(
-                POLYMARKET_CLOB,
-                key=POLY_PRIVATE_KEY,
-                chain_id=137,
-                signature_type=POLY_SIGNATURE_TYPE,
-                funder=POLY_FUNDER_ADDRESS
-            )
-            creds = self.clob_client.create_or_derive_api_creds()
-            self.clob_client.set_api_creds(creds)
-            self.initialized = True
-            print("✅ Trading client initialized")
-            return True
-        except Exception as e:
-            print(f"❌ Init error: {e}")
+        while len(self.books) > self.max_books:
+            self.books.popitem(last=False)
+        
+        if new:
+            self.pending.extend(new)
+            self.subscribe_ready.set()
+        return new
+    
+    def _load(self, item: dict, live: bool):
+        token_id = item.get("asset_id")
+        if token_id not in self.books:
+            return
+        self.books[token_id] = LocalBook(
+            bids={float(level["price"]): float(level["size"]) for level in item.get("bids") or []},
+            asks={float(level["price"]): float(level["size"]) for level in item.get("asks") or []},
+            updated_at=time.time(),
+            live=live,
+        )
+    
+    async def refresh(self, token_ids: List[str]):
+        """Load REST snapshots for the given tokens"""
+        for i in range(0, len(token_ids), 100):
+            chunk = [token_id for token_id in token_ids[i:i + 100] if token_id in self.books]
+            if not chunk:
+                continue
+            try:
+                response = await self.http.post(
+                    f"{POLYMARKET_CLOB}/books",
+                    json=[{"token_id": token_id} for token_id in chunk]
+                )
+                if response.status_code == 200:
+                    for item in decode_json(response.content):
+                        self._load(item, live=False)
+            except Exception as e:
+                print(f"⚠️  Order book snapshot failed: {e}")
+    
+    def _is_fresh(self, book: Optional[LocalBook]) -> bool:
+        if book is None:
             return False
+        return (book.live and self.connected) or time.time() - book.updated_at <= self.max_age
     
-    async def get_market_info(self, condition_id: str) -> Optional[dict]:
-        """Get market info by condition ID"""
-        if condition_id in self.markets_cache:
-            return self.markets_cache[condition_id]
+    def fill_within(self, token_id: str, side: str, amount: float, limit_price: float) -> Optional[tuple]:
+        """(fillable amount, worst price) walking the book up to limit_price.
         
-        try:
-            response = await self.http.get(
-                f"{POLYMARKET_GAMMA}/markets/{condition_id}"
-            )
-            if response.status_code == 200:
-                market = response.json()
-                self.markets_cache[condition_id] = market
-                return market
-        except:
-            pass
+        amount is USD for a BUY and shares for a SELL, like orders. None
+        when we have no fresh book for the token.
+        """
+        book = self.books.get(token_id)
+        if not self._is_fresh(book):
+            return None
         
-        return None
+        filled = 0.0
+        worst = 0.0
+        if side == BUY:
+            for price in sorted(price for price in book.asks if price <= limit_price):
+                filled += min(amount - filled, price * book.asks[price])
+                worst = price
+                if filled >= amount - 1e-9:
+                    break
+        else:
+            for price in sorted((price for price in book.bids if price >= limit_price), reverse=True):
+                filled += min(amount - filled, book.bids[price])
+                worst = price
+                if filled >= amount - 1e-9:
+                    break
+        
+        return filled, worst
     
-    async def get_token_info(self, token_id: str) -> Optional[dict]:
-        """Get token info to determine YES/NO and market"""
-        try:
-            response = await self.http.get(
-                f"{POLYMARKET_CLOB}/token/{token_id}"
-            )
-            if response.status_code == 200:
-                return response.json()
-        except:
-            pass
-        return None
+    def _handle(self, message: str):
+        events = decode_json(message)
+        for event in events if isinstance(events, list) else [events]:
+            kind = event.get("event_type")
+            if kind == "book":
+                self._load(event, live=True)
+            elif kind == "price_change":
+                changes = event.get("price_changes")
+                if changes is None:  # Older per-asset format
+                    changes = [dict(change, asset_id=event.get("asset_id")) for change in event.get("changes", [])]
+                for change in changes:
+                    book = self.books.get(change.get("asset_id"))
+                    if book is None:
+                        continue
+                    levels = book.bids if change.get("side") == "BUY" else book.asks
+                    price, size = float(change["price"]), float(change["size"])
+                    if size > 0:
+                        levels[price] = size
+                    else:
+                        levels.pop(price, None)
+                    book.updated_at = time.time()
     
-    async def buy(self, token_id: str, amount_usd: float) -> bool:
-        """Execute a market buy order"""
-        if not self.initialized:
-            print("❌ Client not initialized")
-            return False
+    async def _send_subscriptions(self, ws):
+        """Subscribe tokens tracked after the socket connected"""
+        while True:
+            await self.subscribe_ready.wait()
+            self.subscribe_ready.clear()
+            tokens, self.pending = self.pending, []
+            if tokens:
+                await ws.send(json.dumps({"assets_ids": tokens, "operation": "subscribe"}))
+    
+    async def run(self):
+        """Consume the market channel until stopped, reconnecting on drops"""
+        if websockets is None:
+            print("⚠️  websockets not installed, order books refresh from snapshots only")
+            return
         
-        try:
-            from py_clob_client.clob_types import MarketOrderArgs, OrderType
-            from py_clob_client.order_builder.constants import BUY
-            
-            # Create market order
-            order_args = MarketOrderArgs(
-                token_id=token_id,
-                amount=amount_usd,
-                side=BUY,
-            )
-            
-            signed_order = self.clob_client.create_market_order(order_args)
-            result = self.clob_client.post_order(signed_order, OrderType.FOK)
+        self.running = True
+        attempt = 0
+        
+        while self.running:
+            # The channel needs at least one asset to subscribe to
+            while not self.books and self.running:
+                self.subscribe_ready.clear()
+                await self.subscribe_ready.wait()
             
-            print(f"✅ BUY order executed: {result}")
-            return True
+            try:
+                async with websockets.connect(self.url, ping_interval=5, ping_timeout=10) as ws:
+                    self.pending = []
+                    self.subscribe_ready.clear()
+                    await ws.send(json.dumps({"assets_ids": list(self.books), "type": "market"}))
+                    self.connected = True
+                    attempt = 0
+                    print("📗 Order book stream connected")
+                    
+                    sender = asyncio.create_task(self._send_subscriptions(ws))
+                    try:
+                        async for message in ws:
+                            if isinstance(message, bytes):
+                                message = message.decode()
+                            try:
+                                self._handle(message)
+                            except Exception as e:
+                                print(f"⚠️  Error handling book event: {e}")
+                    finally:
+                        sender.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Order book stream error: {e}")
+            finally:
+                self.connected = False
+                for book in self.books.values():
+                    if book is not None:
+                        book.live = False
             
-        except Exception as e:
-            print(f"❌ BUY order failed: {e}")
-            return False
+            if self.running:
+                delay = backoff_delay(attempt, base=1.0, cap=30.0)
+                attempt += 1
+                await asyncio.sleep(delay)
     
-    async def sell(self, token_id: str, amount_usd: float) -> bool:
-        """Execute a market sell order"""
-        if not self.initialized:
-            print("❌ Client not initialized")
-            return False
+    async def refresh_loop(self):
+        """Snapshot fallback: re-load stale books while the socket is down"""
+        self.running = True
+        while self.running:
+            await asyncio.sleep(self.max_age / 2)
+            stale = [token_id for token_id, book in self.books.items()
+                     if not self._is_fresh(book) and not (book is None and self.connected)]
+            if stale:
+                await self.refresh(stale)
+    
+    def stop(self):
+        self.running = False
+        self.subscribe_ready.set()
+
+
+# =============================================================================
+# COPY PIPELINE
+# =============================================================================
+
+class TradeQueue:
+    """Bounded queue between detection and copying.
+    
+    The biggest whale trades are copied first, and trades past their
+    max-age deadline are dropped instead of being executed late.
+    """
+    
+    def __init__(self, maxsize: int = COPY_QUEUE_SIZE, max_age: float = MAX_TRADE_AGE_SECONDS,
+                 on_drop: Optional[Callable[[WhaleTrade], Awaitable[None]]] = None):
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue(max(1, maxsize))
+        self.max_age = max_age
+        self.on_drop = on_drop  # Called with each stale trade dropped
+        self.sequence = itertools.count()  # FIFO among equal sizes
+    
+    def put(self, whale_trade: WhaleTrade) -> bool:
+        """Queue a trade without waiting; False if the queue is full"""
+        whale_trade.deadline = trade_epoch(whale_trade) + self.max_age
         
         try:
-            from py_clob_client.clob_types import MarketOrderArgs, OrderType
-            from py_clob_client.order_builder.constants import SELL
-            
-            # Create market order
-            order_args = MarketOrderArgs(
-                token_id=token_id,
-                amount=amount_usd,
-                side=SELL,
-            )
-            
-            signed_order = self.clob_client.create_market_order(order_args)
-            result = self.clob_client.post_order(signed_order, OrderType.FOK)
+            self.queue.put_nowait((-whale_trade.amount_usd, next(self.sequence), whale_trade))
+        except asyncio.QueueFull:
+            metrics.inc("trades_dropped_total", reason="queue_full")
+            print(f"⚠️  Copy queue full, dropping {whale_trade.side} ${whale_trade.amount_usd:,.2f}")
+            return False
+        
+        return True
+    
+    async def get(self) -> WhaleTrade:
+        """Next trade that is still fresh enough to copy"""
+        while True:
+            _, _, whale_trade = await self.queue.get()
+            self.queue.task_done()
             
-            print(f"✅ SELL order executed: {result}")
-            return True
+            age = time.time() - trade_epoch(whale_trade)
+            if time.time() <= whale_trade.deadline:
+                return whale_trade
             
-        except Exception as e:
-            print(f"❌ SELL order failed: {e}")
-            return False
+            metrics.inc("trades_dropped_total", reason="stale")
+            if self.on_drop:
+                await self.on_drop(whale_trade)
+            print(f"⌛ Dropping stale trade ({age:.0f}s old): {whale_trade.side} {whale_trade.market_title[:40]}")
     
-    async def close(self):
-        await self.http.aclose()
+    def qsize(self) -> int:
+        return self.queue.qsize()
+
+
+def merge_fills(fills: List[WhaleTrade]) -> Optional[WhaleTrade]:
+    """Net a whale's fills on one token into a single trade (None if flat)"""
+    if len(fills) == 1:
+        return fills[0]
+    
+    net = sum(fill.amount_usd if fill.side == "BUY" else -fill.amount_usd for fill in fills)
+    if abs(net) < 0.01:
+        return None
+    
+    side = "BUY" if net > 0 else "SELL"
+    same_side = [fill for fill in fills if fill.side == side]
+    shares = sum(fill.amount_usd / fill.price for fill in same_side if fill.price > 0)
+    price = sum(fill.amount_usd for fill in same_side) / shares if shares else same_side[-1].price
+    
+    # The latest fill carries the freshest timestamp for the staleness deadline
+    latest = max(fills, key=trade_epoch)
+    return replace(latest, side=side, amount_usd=abs(net), price=price, fills=len(fills))
+
+
+class OrderCoalescer:
+    """Merges a whale's follow-up fills on the same token for a short window.
+    
+    Whales often split one position into many fills. The first fill is
+    copied at once, so coalescing never delays a lone trade; the fills that
+    follow it within the window are netted into one more order instead of
+    one FOK order (and one daily-limit slot) each.
+    """
+    
+    def __init__(self, emit: Callable[[WhaleTrade], Awaitable[None]], window: float = COALESCE_WINDOW_SECONDS,
+                 on_merge: Optional[Callable[[List[WhaleTrade], Optional[WhaleTrade]], Awaitable[bool]]] = None):
+        self.emit = emit
+        self.window = window
+        self.on_merge = on_merge  # Called with follow-up fills and their net trade; False cancels it
+        self.buckets: Dict[tuple, List[WhaleTrade]] = {}
+        self.timers: Dict[tuple, asyncio.Task] = {}
+    
+    async def add(self, whale_trade: WhaleTrade):
+        if self.window <= 0:
+            await self.emit(whale_trade)
+            return
+        
+        key = (whale_trade.whale_address, whale_trade.token_id)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            self.buckets[key] = []
+            self.timers[key] = asyncio.create_task(self._flush_after(key))
+            await self.emit(whale_trade)
+        else:
+            bucket.append(whale_trade)
+    
+    async def _flush_after(self, key: tuple):
+        await asyncio.sleep(self.window)
+        self.timers.pop(key, None)
+        await self._flush(key)
+    
+    async def _flush(self, key: tuple):
+        fills = self.buckets.pop(key, None)
+        if not fills:
+            return
+        
+        merged = merge_fills(fills)
+        if len(fills) > 1 and self.on_merge and not await self.on_merge(fills, merged):
+            return
+        metrics.inc("fills_merged_total", len(fills) - 1)
+        
+        if merged is None:
+            print(f"🧩 {len(fills)} follow-up fills on {key[1][:20]}... netted out flat, nothing more to copy")
+            return
+        
+        if len(fills) > 1:
+            print(f"🧩 Merged {len(fills)} follow-up fills on {key[1][:20]}... into one {merged.side} ${merged.amount_usd:,.2f}")
+        await self.emit(merged)
+    
+    async def flush_all(self):
+        """Emit every open bucket now, e.g. before shutting down"""
+        for timer in self.timers.values():
+            timer.cancel()
+        self.timers.clear()
+        for key in list(self.buckets):
+            await self._flush(key)
 
 
 # =============================================================================
-# WHALE TRACKER
+# SCHEDULING
 # =============================================================================
 
-class WhaleTracker:
-    """Tracks trades from the whale wallet"""
+class PollScheduler:
+    """Adaptive delay between scans.
     
-    def __init__(self, whale_address: str):
-        self.whale_address = whale_address.lower()
-        self.http = httpx.AsyncClient(timeout=30.0)
-        self.last_seen_trade_id: Optional[str] = None
-        self.seen_trades: set = set()
+    Snaps to the minimum interval after whale activity, decays towards the
+    maximum while quiet, and backs off with jitter when scans fail or the
+    API is rate limiting us.
+    """
     
-    async def get_recent_trades(self) -> List[WhaleTrade]:
-        """Fetch recent trades from the whale using Polymarket Data API"""
-        trades = []
+    def __init__(self, wallets: int = 1, min_interval: float = MIN_POLL_INTERVAL,
+                 max_interval: float = MAX_POLL_INTERVAL, decay: float = POLL_DECAY):
+        # Never plan scans faster than the shared rate budget can serve them,
+        # leaving a fifth of it for metadata and order calls
+        quota_floor = wallets / (rate_limiter.rate * 0.8)
+        self.min_interval = max(min_interval, quota_floor)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.decay = max(1.0, decay)
+        self.interval = self.min_interval
+        self.errors = 0
+    
+    def record_poll(self, new_trades: int, failed: bool = False) -> float:
+        """Delay before the next scan given how this one went"""
+        if failed:
+            return self.record_error()
         
-        # Use the correct Data API endpoint
-        try:
-            response = await self.http.get(
-                "https://data-api.polymarket.com/trades",
-                params={
-                    "proxyWallet": self.whale_address,
-                    "limit": 50
-                }
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                print(f"📡 Fetched {len(data)} trades from API")
-                
-                for item in data:
-                    try:
-                        # Create unique trade ID
-                        trade_id = item.get("transactionHash") or item.get("id") or f"{item.get('timestamp')}_{item.get('asset')}"
-                        
-                        if trade_id in self.seen_trades:
-                            continue
-                        
-                        # Get side
-                        side = item.get("side", "").upper()
-                        if side not in ["BUY", "SELL"]:
-                            continue
-                        
-                        # Calculate amount in USD
-                        size = float(item.get("size", 0) or 0)
-                        price = float(item.get("price", 0) or 0)
-                        amount = size * price
-                        
-                        if amount < MIN_WHALE_TRADE_SIZE:
-                            continue
-                        
-                        # The 'asset' field is the token ID we need!
-                        token_id = item.get("asset", "")
-                        
-                        if not token_id:
-                            print(f"⚠️  Trade missing token ID: {item}")
-                            continue
-                        
-                        # Get market info
-                        title = item.get("title", "") or item.get("slug", "") or "Unknown"
-                        outcome = item.get("outcome", "YES")
-                        
-                        trades.append(WhaleTrade(
-                            timestamp=str(item.get("timestamp", "")),
-                            market_id=item.get("conditionId", ""),
-                            market_title=title,
-                            side=side,
-                            outcome=outcome,
-                            amount_usd=amount,
-                            price=price,
-                            token_id=token_id
-                        ))
-                        
-                        self.seen_trades.add(trade_id)
-                        print(f"✅ New trade found: {side} {outcome} ${amount:.2f} @ ${price:.3f} - Token: {token_id[:20]}...")
-                        
-                    except Exception as e:
-                        print(f"⚠️  Error parsing trade: {e}")
-                        continue
-            else:
-                print(f"⚠️  API returned status {response.status_code}")
-                        
-        except Exception as e:
-            print(f"❌ Error fetching trades: {e}")
+        self.errors = 0
+        if new_trades:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.decay)
         
-        return trades
+        return max(self.interval, rate_limiter.blocked_for())
     
-    async def close(self):
-        await self.http.aclose()
+    def record_error(self) -> float:
+        delay = backoff_delay(self.errors)
+        self.errors += 1
+        return max(delay, rate_limiter.blocked_for())
+
+
+async def wait_for_next_scan(delay: float, stream: Optional[TradeStream] = None):
+    """Sleep until the next scan, waking early if the stream goes up or down"""
+    if not stream:
+        await asyncio.sleep(delay)
+        return
+    
+    # While the stream is healthy, polling only reconciles missed events
+    if stream.connected:
+        delay = max(delay, STREAM_POLL_INTERVAL)
+    
+    stream.state_changed.clear()
+    try:
+        await asyncio.wait_for(stream.state_changed.wait(), timeout=delay)
+    except asyncio.TimeoutError:
+        pass
+
+
+# =============================================================================
+# SHARDING
+# =============================================================================
+
+class HashRing:
+    """Consistent hash ring: changing the worker count moves only ~1/N of the wallets"""
+    
+    def __init__(self, nodes: int, replicas: int = 100):
+        self.ring = sorted(
+            (self._hash(f"worker-{node}#{replica}"), node)
+            for node in range(max(1, nodes)) for replica in range(replicas)
+        )
+        self.points = [point for point, _ in self.ring]
+    
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+    
+    def node_for(self, key: str) -> int:
+        i = bisect.bisect(self.points, self._hash(key)) % len(self.points)
+        return self.ring[i][1]
+
+
+def shard_whales(whales: List[WhaleConfig], workers: int) -> List[List[WhaleConfig]]:
+    """Split wallets across workers by consistent hashing; empty shards are dropped"""
+    ring = HashRing(workers)
+    shards: List[List[WhaleConfig]] = [[] for _ in range(max(1, workers))]
+    for whale in whales:
+        shards[ring.node_for(whale.address)].append(whale)
+    return [shard for shard in shards if shard]
+
+
+class DetectorWorker:
+    """Sharded detection: polls (and optionally streams) a slice of the wallets
+    and forwards new trades to the supervisor, which does all copying.
+    
+    Dedupe state is the shared SQLite store, so a restarted or resharded
+    worker resumes from the same cursors.
+    """
+    
+    def __init__(self, index: int, whales: List[WhaleConfig], detections, stop_event):
+        self.index = index
+        self.detections = detections
+        self.stop_event = stop_event
+        self.http = create_http_client()
+        self.tracker = MultiWhaleTracker(whales, http=self.http)
+        self.scheduler = PollScheduler(wallets=len(whales))
+        self.stream = TradeStream(self.tracker.trackers, self.forward) if STREAM_ENABLED else None
+    
+    async def forward(self, trades: List[WhaleTrade]):
+        """Send trades, with the metrics recorded since the last send, to the supervisor"""
+        counters, histograms = metrics.drain()
+        await asyncio.to_thread(self.detections.put, (trades, counters, histograms))
+    
+    async def run(self):
+        print(f"🧵 Worker {self.index} watching {len(self.tracker.trackers)} wallet(s)")
+        stream_task = asyncio.create_task(self.stream.run()) if self.stream else None
+        
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    poll_started = time.perf_counter()
+                    new_trades = await self.tracker.get_recent_trades(self.forward)
+                    metrics.observe("poll_duration_ms", (time.perf_counter() - poll_started) * 1000)
+                    metrics.inc("polls_total")
+                    if new_trades:
+                        print(f"\n🔍 Worker {self.index} found {len(new_trades)} new whale trade(s)!")
+                    # Trades went out wallet by wallet; this sends the scan's metrics even when nothing traded
+                    await self.forward([])
+                    
+                    all_failed = self.tracker.failed_polls >= len(self.tracker.trackers)
+                    await wait_for_next_scan(self.scheduler.record_poll(len(new_trades), failed=all_failed), self.stream)
+                except Exception as e:
+                    print(f"❌ Worker {self.index} error: {e}")
+                    await asyncio.sleep(self.scheduler.record_error())
+        finally:
+            if self.stream:
+                self.stream.stop()
+                stream_task.cancel()
+            await self.tracker.close()
+            await self.http.aclose()
+
+
+def run_detector(index: int, workers: int, whales: List[WhaleConfig], detections, stop_event):
+    """Worker process entry point"""
+    global rate_limiter
+    # Workers split four fifths of the request budget; the supervisor keeps the rest for orders
+    rate_limiter = RateLimiter(rate=API_RATE_LIMIT * 0.8 / workers, burst=max(1.0, API_RATE_BURST / workers))
+    
+    try:
+        asyncio.run(DetectorWorker(index, whales, detections, stop_event).run())
+    except KeyboardInterrupt:
+        pass
 
 
 # =============================================================================
@@ -301,13 +2538,52 @@ class WhaleTracker:
 class WhaleCopyBot:
     """Main whale copy trading bot"""
     
-    def __init__(self):
-        self.trader = PolymarketTrader()
-        self.tracker = WhaleTracker(WHALE_ADDRESS)
+    def __init__(self, workers: int = WORKERS):
+        # One pool for Data, Gamma and CLOB calls, so connections opened at startup get reused
+        self.http = create_http_client()
+        self.trader = PolymarketTrader(self.http)
+        self.whales = {whale.address: whale for whale in load_whales()}
+        
+        # With several workers, detection runs in worker processes and this one only copies.
+        # Orders keep the parallel ORDER_WORKERS pool: limits and positions are reserved on
+        # this event loop before an order is submitted, and CLOB orders carry a random salt
+        # rather than a sequential nonce, so concurrent signing cannot collide
+        self.shards = shard_whales(list(self.whales.values()), workers) if workers > 1 else []
+        self.worker_processes: Dict[int, multiprocessing.Process] = {}
+        self.detections = None
+        self.stop_event = None
+        self.tracker = MultiWhaleTracker([] if self.shards else list(self.whales.values()), http=self.http)
+        self.scheduler = PollScheduler(wallets=len(self.whales))
+        self.stream = TradeStream(self.tracker.trackers, self.process_trades) if STREAM_ENABLED and not self.shards else None
+        self.stream_task: Optional[asyncio.Task] = None
+        self.queue = TradeQueue(on_drop=self.drop_pending)
+        self.pending = PendingTradeStore()
+        self.lease = LeaderLease() if LEADER_LEASE_ENABLED else None
+        self.coalescer = OrderCoalescer(self.enqueue, on_merge=self.merge_pending)
+        self.books = BookCache(self.http)
+        self.book_tasks: List[asyncio.Task] = []
+        self.copy_tasks: List[asyncio.Task] = []
+        self.background_tasks: set = set()
         self.running = False
-        self.trades_today = 0
+        self.pending_copies = 0  # Orders in flight, counted against the daily limit
+        self.metrics_server = MetricsServer() if METRICS_PORT else None
+        
+        metrics.gauge("queue_depth", self.queue.qsize)
+        metrics.gauge("orders_in_flight", lambda: self.trader.executor.in_flight)
+        metrics.gauge("trades_today", lambda: self.trades_today)
+        metrics.gauge("leader", self.is_leader)
+        metrics.gauge("wallets_watched", lambda: len(self.whales))
+        metrics.gauge("stream_connected", lambda: bool(self.stream and self.stream.connected))
+        # Looked up at scrape time: supervise() swaps in a smaller limiter
+        metrics.gauge("rate_limit_blocked_seconds", lambda: rate_limiter.blocked_for())
+        metrics.gauge("positions_open", lambda: len(self.trader.positions.positions))
+        metrics.gauge("exposure_usd", self.trader.positions.total_exposure)
+        metrics.gauge("order_books_cached", lambda: len(self.books.books))
+        metrics.gauge("order_book_stream_connected", lambda: self.books.connected)
+        metrics.gauge("time_to_first_poll_seconds", lambda: self.time_to_first_poll or 0.0)
+        self.time_to_first_poll: Optional[float] = None
         self.total_copied = 0
-        self.copied_trades: List[CopiedTrade] = []
+        self.ledger = TradeLedger()
         self.start_time = None
     
     async def initialize(self):
@@ -318,27 +2594,42 @@ class WhaleCopyBot:
         if not success:
             return False
         
-        print_config()
+        print_config(list(self.whales.values()))
         return True
     
+    @property
+    def trades_today(self) -> int:
+        return self.ledger.trades_today()
+    
+    def is_leader(self) -> bool:
+        """Whether this instance may copy trades"""
+        return self.lease is None or self.lease.is_held()
+    
+    def copy_amount_for(self, whale_trade: WhaleTrade) -> float:
+        """Per-wallet copy size, falling back to COPY_AMOUNT_USD"""
+        whale = self.whales.get(whale_trade.whale_address)
+        return whale.copy_amount_usd if whale else COPY_AMOUNT_USD
+    
     async def copy_trade(self, whale_trade: WhaleTrade) -> bool:
         """Copy a whale trade"""
+        our_amount = self.copy_amount_for(whale_trade)
         
         print(f"""
 ╔══════════════════════════════════════════════════════════════════════╗
 ║ 🐋 WHALE TRADE DETECTED!                                             ║
 ╠══════════════════════════════════════════════════════════════════════╣
+║ Whale:   {whale_trade.whale_address}
 ║ Market:  {whale_trade.market_title[:55]:<55}
 ║ Side:    {whale_trade.side} {whale_trade.outcome}
-║ Amount:  ${whale_trade.amount_usd:,.2f}
+║ Amount:  ${whale_trade.amount_usd:,.2f} ({whale_trade.fills} fill(s))
 ║ Price:   ${whale_trade.price:.3f}
 ╠══════════════════════════════════════════════════════════════════════╣
 ║ 📋 COPYING TRADE...                                                  ║
-║ Our Amount: ${COPY_AMOUNT_USD:.2f}
+║ Our Amount: ${our_amount:.2f}
 ╚══════════════════════════════════════════════════════════════════════╝
         """)
         
-        if self.trades_today >= MAX_DAILY_TRADES:
+        if self.trades_today + self.pending_copies >= MAX_DAILY_TRADES:
             print("⚠️  Daily trade limit reached, skipping")
             return False
         
@@ -346,31 +2637,211 @@ class WhaleCopyBot:
             print("⚠️  No token ID available, skipping")
             return False
         
-        # Execute our copy trade - BUY or SELL
+        # Size against our own book: BUYs under the market cap, SELLs in shares we hold
+        positions = self.trader.positions
         if whale_trade.side == "BUY":
-            success = await self.trader.buy(whale_trade.token_id, COPY_AMOUNT_USD)
+            our_amount = positions.buy_size(whale_trade.market_id, our_amount)
+            if our_amount < MIN_ORDER_USD:
+                print("⚠️  Market exposure cap reached, skipping")
+                return False
         elif whale_trade.side == "SELL":
-            success = await self.trader.sell(whale_trade.token_id, COPY_AMOUNT_USD)
+            if whale_trade.price <= 0:
+                print("⚠️  No whale price to size the SELL, skipping")
+                return False
+            shares = positions.sell_size(whale_trade.token_id, our_amount / whale_trade.price)
+            if shares * whale_trade.price < MIN_ORDER_USD:
+                print("⚠️  No position to sell, skipping")
+                return False
+            our_amount = shares * whale_trade.price
         else:
             print(f"⚠️  Unknown trade side: {whale_trade.side}, skipping")
             return False
         
+        # Slippage check against the local book: cap to what fills near the whale's price
+        limit_price = 0.0
+        if MAX_SLIPPAGE > 0 and whale_trade.price > 0:
+            if whale_trade.side == "BUY":
+                worst_allowed = whale_trade.price * (1 + MAX_SLIPPAGE)
+                quote = self.books.fill_within(whale_trade.token_id, BUY, our_amount, worst_allowed)
+            else:
+                worst_allowed = whale_trade.price * (1 - MAX_SLIPPAGE)
+                quote = self.books.fill_within(whale_trade.token_id, SELL, shares, worst_allowed)
+            
+            if quote is None:
+                metrics.inc("slippage_checks_total", result="no_book")
+            else:
+                fillable, limit_price = quote
+                requested = our_amount if whale_trade.side == "BUY" else shares
+                notional = fillable if whale_trade.side == "BUY" else fillable * whale_trade.price
+                if notional < MIN_ORDER_USD:
+                    metrics.inc("slippage_checks_total", result="rejected")
+                    print(f"⚠️  Price moved more than {MAX_SLIPPAGE:.0%} from the whale's ${whale_trade.price:.3f}, skipping")
+                    return False
+                if fillable < requested - 1e-9:
+                    metrics.inc("slippage_checks_total", result="capped")
+                    print(f"✂️  Only {fillable:.2f} of {requested:.2f} fills within {MAX_SLIPPAGE:.0%} of the whale's price")
+                    if whale_trade.side == "BUY":
+                        our_amount = fillable
+                    else:
+                        shares = fillable
+                        our_amount = shares * whale_trade.price
+                else:
+                    metrics.inc("slippage_checks_total", result="ok")
+        
+        # A standby may own the lease by now if we stalled; it copies instead
+        if not self.is_leader():
+            print("⚠️  No longer the leader, not copying")
+            return False
+        
+        # Execute our copy trade - BUY or SELL
+        observe_stage("detect_to_order", whale_trade.detected_at, time.time())
+        self.pending_copies += 1
+        try:
+            if whale_trade.side == "BUY":
+                success = await self.trader.buy(whale_trade.token_id, our_amount,
+                                                whale_trade.market_id, whale_trade.price, limit_price)
+            else:
+                success = await self.trader.sell(whale_trade.token_id, shares,
+                                                 whale_trade.market_id, whale_trade.price, limit_price)
+        finally:
+            self.pending_copies -= 1
+        
         if success:
-            self.trades_today += 1
             self.total_copied += 1
+            observe_stage("end_to_end", chain_epoch(whale_trade), time.time())
+            observe_stage("detect_to_fill", whale_trade.detected_at, time.time())
             print(f"✅ Successfully copied {whale_trade.side} trade!")
         else:
             print(f"❌ Failed to copy trade")
         
-        self.copied_trades.append(CopiedTrade(
+        await self.ledger.record(CopiedTrade(
             whale_trade=whale_trade,
-            our_amount=COPY_AMOUNT_USD,
+            our_amount=our_amount,
             success=success,
             timestamp=datetime.now(timezone.utc).isoformat()
         ))
         
         return success
     
+    def spawn(self, coro):
+        """Run a background task, keeping a reference until it finishes"""
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return task
+    
+    async def process_trades(self, new_trades: List[WhaleTrade]):
+        """Hand newly detected trades, polled or streamed, to the copy workers"""
+        # Metadata loads while trades wait in the queue; copies join the in-flight fetch
+        self.spawn(self.trader.prefetch(
+            [trade.market_id for trade in new_trades],
+            [trade.token_id for trade in new_trades]
+        ))
+        self.track_books([trade.token_id for trade in new_trades])
+        
+        for trade in new_trades:
+            await self.coalescer.add(trade)
+    
+    async def enqueue(self, whale_trade: WhaleTrade):
+        """Queue a (possibly merged) trade, already in the pending store, for the copy workers"""
+        whale = self.whales.get(whale_trade.whale_address)
+        if whale_trade.fills > 1 and whale and whale_trade.amount_usd < whale.min_trade_size:
+            print(f"🧩 Net ${whale_trade.amount_usd:,.2f} after merging is below the minimum, skipping")
+            await self.drop_pending(whale_trade)
+            return
+        
+        if not self.queue.put(whale_trade):
+            await self.drop_pending(whale_trade)
+    
+    async def merge_pending(self, fills: List[WhaleTrade], merged: Optional[WhaleTrade]) -> bool:
+        """Replace coalesced fills' pending rows with the merged trade's"""
+        # Without the lease the fills stay stored as they are, for the next leader
+        if not self.is_leader():
+            return False
+        return await self.pending.merge([fill.pending_id for fill in fills if fill.pending_id], merged)
+    
+    async def drop_pending(self, whale_trade: WhaleTrade):
+        if whale_trade.pending_id:
+            await self.pending.claim(whale_trade.pending_id)
+    
+    async def recover_pending(self):
+        """Queue trades that a previous instance detected but never copied"""
+        trades = await self.pending.load()
+        for trade in trades:
+            if not self.queue.put(trade):
+                await self.drop_pending(trade)
+        
+        if trades:
+            metrics.inc("trades_recovered_total", len(trades))
+            print(f"♻️  Recovered {len(trades)} uncopied trade(s) from the last run")
+            self.track_books([trade.token_id for trade in trades])
+    
+    async def copy_worker(self):
+        """Consumer: copies queued trades until the bot stops"""
+        while self.running:
+            trade = await self.queue.get()
+            # Claimed before the order goes out, so a crash can't make the next leader copy it again
+            if not self.is_leader() or (trade.pending_id and not await self.pending.claim(trade.pending_id)):
+                continue
+            try:
+                await self.copy_trade(trade)
+            except Exception as e:
+                print(f"❌ Error copying trade: {e}")
+    
+    def track_books(self, token_ids: List[str]):
+        """Start keeping order books for these tokens, snapshotting new ones now"""
+        new = self.books.track(token_ids)
+        if new:
+            self.spawn(self.books.refresh(new))
+    
+    async def warm_up(self):
+        """Load metadata and order books for what the whales hold"""
+        self.track_books(await self.trader.prefetch_whale_positions(list(self.whales)))
+    
+    async def wait_for_lease(self):
+        """Standby: stay warm until the leader's lease lapses, then take over"""
+        if await self.lease.try_acquire():
+            print("👑 Leading (no other instance holds the lease)")
+            return
+        
+        print("🧊 Standby: waiting for the leader's lease to lapse")
+        warmed = time.monotonic()
+        
+        while self.running and not await self.lease.try_acquire():
+            await asyncio.sleep(LEASE_RENEW_SECONDS)
+            # Reuse pooled connections on takeover (httpx drops idle ones after 5s)
+            if time.monotonic() - warmed >= 4:
+                warmed = time.monotonic()
+                self.spawn(self.trader.warm_connections())
+        
+        if not self.running:
+            return
+        
+        # Pick up where the old leader left off
+        print("👑 Took over as leader")
+        self.tracker.store.reload_cursors()
+        self.ledger.reload_today()
+        if await self.trader.sync_positions():
+            self.track_books(list(self.trader.positions.positions))
+    
+    async def hold_lease(self):
+        """Leader: renew the lease, stopping if another instance took it"""
+        while self.running:
+            await asyncio.sleep(LEASE_RENEW_SECONDS)
+            if not await self.lease.try_acquire():
+                print("⚠️  Lost the leader lease to another instance, stopping")
+                self.running = False
+                return
+    
+    async def position_sync_loop(self):
+        """Reconcile our position book with the Data API in the background"""
+        while self.running:
+            if await self.trader.sync_positions():
+                positions = self.trader.positions
+                self.track_books(list(positions.positions))
+                print(f"📒 Synced {len(positions.positions)} position(s), ${positions.total_exposure():,.2f} cost basis")
+            await asyncio.sleep(POSITION_SYNC_INTERVAL)
+    
     async def run(self):
         """Main bot loop"""
         self.running = True
@@ -378,42 +2849,154 @@ class WhaleCopyBot:
         
         print(f"""
 🚀 BOT STARTED - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-   Watching whale: {WHALE_ADDRESS}
-   Copy amount: ${COPY_AMOUNT_USD}
+   Watching: {len(self.whales)} whale(s) - {', '.join(list(self.whales)[:3])}{' ...' if len(self.whales) > 3 else ''}
+   Copy amount: ${COPY_AMOUNT_USD} (default)
    Press Ctrl+C to stop
         """)
         
         scan_count = 0
         
+        self.spawn(self.trader.warm_signer())
+        self.spawn(self.position_sync_loop())
+        self.spawn(self.warm_up())
+        self.book_tasks = [
+            asyncio.create_task(self.books.run()),
+            asyncio.create_task(self.books.refresh_loop()),
+        ]
+        
+        if self.metrics_server:
+            await self.metrics_server.start()
+        
+        # A standby stays here with warm connections, metadata and books until it leads
+        if self.lease:
+            await self.wait_for_lease()
+            if not self.running:
+                return
+            self.spawn(self.hold_lease())
+        
+        await self.recover_pending()
+        if self.stream:
+            self.stream_task = asyncio.create_task(self.stream.run())
+        
+        self.copy_tasks = [
+            asyncio.create_task(self.copy_worker())
+            for _ in range(max(1, COPY_CONCURRENCY))
+        ]
+        
+        if self.shards:
+            await self.supervise()
+            return
+        
         while self.running:
             try:
                 scan_count += 1
                 
                 # Check for new whale trades
-                new_trades = await self.tracker.get_recent_trades()
+                poll_started = time.perf_counter()
+                new_trades = await self.tracker.get_recent_trades(self.process_trades)
+                metrics.observe("poll_duration_ms", (time.perf_counter() - poll_started) * 1000)
+                metrics.inc("polls_total")
+                self.record_first_poll()
                 
                 if new_trades:
                     print(f"\n🔍 Found {len(new_trades)} new whale trade(s)!")
-                    
-                    for trade in new_trades:
-                        await self.copy_trade(trade)
-                        await asyncio.sleep(1)  # Small delay between copies
                 
                 # Status update every 10 scans
                 if scan_count % 10 == 0:
                     self.print_status()
+                    self.trader.save_metadata()
                 
-                # Reset daily counter at midnight UTC
-                now = datetime.now(timezone.utc)
-                if now.hour == 0 and now.minute == 0:
-                    self.trades_today = 0
-                
-                # Wait before next scan
-                await asyncio.sleep(30)  # Check every 30 seconds
+                # Wait before next scan - sooner while the whales are active
+                all_failed = self.tracker.failed_polls >= len(self.tracker.trackers)
+                await wait_for_next_scan(self.scheduler.record_poll(len(new_trades), failed=all_failed), self.stream)
                 
             except Exception as e:
                 print(f"❌ Error in main loop: {e}")
-                await asyncio.sleep(60)
+                await asyncio.sleep(self.scheduler.record_error())
+    
+    def record_first_poll(self):
+        if self.time_to_first_poll is None:
+            self.time_to_first_poll = time.perf_counter() - STARTED_AT
+            print(f"⏱️  First poll done {self.time_to_first_poll:.2f}s after startup")
+    
+    def merge_worker_metrics(self, counters: Dict[tuple, float], histograms: Dict[tuple, Histogram]):
+        """Fold a detector worker's metrics into ours, so /metrics covers the whole bot"""
+        metrics.merge(counters, histograms)
+        if Metrics._key("polls_total", {}) in counters:
+            self.record_first_poll()
+    
+    def start_worker(self, ctx, index: int):
+        process = ctx.Process(
+            target=run_detector,
+            args=(index, len(self.shards), self.shards[index], self.detections, self.stop_event),
+            name=f"detector-{index}",
+            daemon=True,
+        )
+        process.start()
+        self.worker_processes[index] = process
+    
+    def read_detections(self, loop: asyncio.AbstractEventLoop):
+        """Runs on a thread: hand trades and metrics from the workers to the event loop"""
+        while self.running:
+            try:
+                trades, counters, histograms = self.detections.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            loop.call_soon_threadsafe(self.merge_worker_metrics, counters, histograms)
+            if trades:
+                asyncio.run_coroutine_threadsafe(self.process_trades(trades), loop)
+    
+    async def supervise(self):
+        """Run the detector workers, restarting any that die, and copy what they find"""
+        ctx = multiprocessing.get_context("spawn")
+        self.detections = ctx.Queue(maxsize=COPY_QUEUE_SIZE)
+        self.stop_event = ctx.Event()
+        
+        # Single-process mode gets a fifth of the budget for orders implicitly; here it is explicit
+        global rate_limiter
+        rate_limiter = RateLimiter(rate=API_RATE_LIMIT * 0.2, burst=max(1.0, API_RATE_BURST * 0.2))
+        
+        for index in range(len(self.shards)):
+            self.start_worker(ctx, index)
+        print(f"🧵 Supervising {len(self.shards)} detector workers over {len(self.whales)} wallets")
+        
+        loop = asyncio.get_running_loop()
+        reader = loop.run_in_executor(None, self.read_detections, loop)
+        ticks = 0
+        
+        try:
+            while self.running:
+                await asyncio.sleep(1)
+                ticks += 1
+                
+                for index, process in list(self.worker_processes.items()):
+                    if not process.is_alive():
+                        print(f"⚠️  Worker {index} exited ({process.exitcode}), restarting")
+                        self.start_worker(ctx, index)
+                
+                if ticks % 60 == 0:
+                    self.print_status()
+                    self.trader.save_metadata()
+        finally:
+            self.running = False
+            await reader
+    
+    def stop_workers(self):
+        if self.stop_event is not None:
+            self.stop_event.set()
+        for process in self.worker_processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+    
+    def lag_summary(self) -> str:
+        """Median whale-fill to our-fill latency, for the status box"""
+        histogram = metrics.histogram("trade_stage_ms", stage="end_to_end")
+        if not histogram or not histogram.count:
+            return "n/a"
+        return f"<= {histogram.quantile(0.5) / 1000:.1f}s ({histogram.count} copies)"
     
     def print_status(self):
         """Print current status"""
@@ -426,23 +3009,50 @@ class WhaleCopyBot:
 │ Uptime:          {str(uptime).split('.')[0]:<52}│
 │ Trades Today:    {self.trades_today}/{MAX_DAILY_TRADES:<50}│
 │ Total Copied:    {self.total_copied:<52}│
-│ Watching:        {WHALE_ADDRESS[:20]}...{' '*28}│
+│ Copy Queue:      {self.queue.qsize():<52}│
+│ Copy Lag p50:    {self.lag_summary():<52}│
+│ Positions:       {f"{len(self.trader.positions.positions)} open, ${self.trader.positions.total_exposure():,.2f} cost":<52}│
+│ Watching:        {len(self.whales):<52}│
 └──────────────────────────────────────────────────────────────────────┘
         """)
     
     async def close(self):
         """Cleanup"""
         self.running = False
+        self.stop_workers()
+        if self.stream:
+            self.stream.stop()
+        if self.stream_task:
+            self.stream_task.cancel()
+        self.books.stop()
+        for task in self.copy_tasks + self.book_tasks + list(self.background_tasks):
+            task.cancel()
+        
+        # Fills still being merged are stored already; merge them so the standby copies
+        # one order per bucket, then let it take over at once
+        if self.is_leader():
+            await self.coalescer.flush_all()
+        if self.lease:
+            await self.lease.release()
+            self.lease.close()
+        self.pending.close()
+        
+        if self.metrics_server:
+            await self.metrics_server.close()
         await self.trader.close()
         await self.tracker.close()
+        await self.http.aclose()
+        self.ledger.close()
         
         print(f"""
 ╔══════════════════════════════════════════════════════════════════════╗
 ║ 📊 SESSION SUMMARY                                                   ║
 ╠══════════════════════════════════════════════════════════════════════╣
 ║ Total Trades Copied: {self.total_copied:<48}║
-║ Successful:          {sum(1 for t in self.copied_trades if t.success):<48}║
-║ Failed:              {sum(1 for t in self.copied_trades if not t.success):<48}║
+║ Successful:          {self.ledger.successful:<48}║
+║ Failed:              {self.ledger.failed:<48}║
+║ Volume:              ${self.ledger.volume_usd:<47,.2f}║
+║ All Sessions:        {f"{self.ledger.lifetime_successful}/{self.ledger.lifetime_total} copied, ${self.ledger.lifetime_volume_usd:,.2f}":<48}║
 ╚══════════════════════════════════════════════════════════════════════╝
         """)
 
@@ -463,13 +3073,14 @@ def print_banner():
     """)
 
 
-def print_config():
+def print_config(whales: List[WhaleConfig]):
     print(f"""
 ┌──────────────────────────────────────────────────────────────────────┐
 │ CONFIGURATION                                                        │
 ├──────────────────────────────────────────────────────────────────────┤
 │ Mode:              🔴 LIVE TRADING                                   │
-│ Whale Address:     {WHALE_ADDRESS[:20]}...                          │
+│ Whales Watched:    {len(whales):<50}│
+│ First Whale:       {whales[0].address[:20] if whales else 'none'}...                          │
 │ Copy Amount:       ${COPY_AMOUNT_USD:<48.2f}│
 │ Max Daily Trades:  {MAX_DAILY_TRADES:<50}│
 │ Min Whale Trade:   ${MIN_WHALE_TRADE_SIZE:<48.0f}│
@@ -489,9 +3100,16 @@ async def main():
         print("❌ Failed to initialize bot")
         return
     
+    # Redeploys send SIGTERM: shut down cleanly so a standby takes over at once
+    run_task = asyncio.ensure_future(bot.run())
     try:
-        await bot.run()
-    except KeyboardInterrupt:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, run_task.cancel)
+    except NotImplementedError:
+        pass  # Windows
+    
+    try:
+        await run_task
+    except (KeyboardInterrupt, asyncio.CancelledError):
         print("\n🛑 Stopping bot...")
     finally:
         await bot.close()